@@ -0,0 +1,289 @@
+"""
+Headless batch roaster.
+
+Roasts every resume in a directory (PDF/TXT) or a JSONL file
+({"id": ..., "text": ...} or {"id": ..., "path": ...} per line) with bounded,
+rate-limit-aware concurrency, streaming results to a JSONL file.
+
+The output file doubles as the checkpoint: re-running the same command skips
+resumes that already have a successful result, so a killed run picks up where
+it stopped.
+
+Usage:
+    python batch_roast.py resumes/ --output roasts.jsonl --concurrency 8 --style savage
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ingestion
+from main import roast_resume, get_llm_guard, PDF_MAX_PAGES, UPLOAD_MAX_BYTES, INGEST_MAX_CHARS, LLM_MAX_IN_FLIGHT
+
+# ======================
+# Input / Checkpoint
+# ======================
+
+def load_resumes(source: str):
+    """
+    Yield (resume_id, resume_text, error) triples from a directory or JSONL file.
+    A resume that can't be read has resume_text None and the reason in error,
+    so one bad file doesn't stop the batch.
+    """
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.lower().endswith(('.pdf', '.txt')):
+                    yield (os.path.relpath(path, source),) + try_read_resume_file(path)
+        return
+
+    with open(source, encoding='utf-8') as resumes:
+        for line_number, line in enumerate(resumes, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield str(line_number), None, f"Invalid JSON on line {line_number}: {e}"
+                continue
+            resume_id = str(record.get('id', line_number))
+            if 'text' in record:
+                yield resume_id, record['text'], None
+            elif 'path' in record:
+                yield (resume_id,) + try_read_resume_file(record['path'])
+            else:
+                yield resume_id, None, "Record has neither 'text' nor 'path'"
+
+def read_resume_file(path: str) -> str:
+    """
+    Read resume text from a PDF or TXT file
+    """
+    with open(path, 'rb') as resume_file:
+        text, _ = ingestion.ingest_bytes(
+            resume_file.read(UPLOAD_MAX_BYTES + 1), UPLOAD_MAX_BYTES, INGEST_MAX_CHARS,
+            is_pdf=path.lower().endswith('.pdf'), max_pages=PDF_MAX_PAGES
+        )
+    return text
+
+def try_read_resume_file(path: str) -> tuple:
+    """
+    read_resume_file that reports failures instead of raising.
+    Returns tuple of (resume_text, error)
+    """
+    try:
+        return read_resume_file(path), None
+    except Exception as e:
+        return None, f"Could not read {path}: {type(e).__name__}: {e}"
+
+def load_completed_ids(output_path: str) -> set:
+    """
+    IDs that already have a successful result in the output file
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding='utf-8') as results:
+        for line in results:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partial last line from a killed run
+            if record.get('success'):
+                completed.add(record['id'])
+    return completed
+
+# ======================
+# Adaptive Concurrency
+# ======================
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter with AIMD control: halves the allowed in-flight roasts and
+    pauses everyone when the API rate-limits us, then adds one slot back after
+    every `increase_every` consecutive successes.
+    """
+
+    def __init__(self, max_concurrency: int, increase_every: int = 10):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.increase_every = increase_every
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self.in_flight >= self.limit:
+                    self._condition.wait()
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_every and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_rate_limit(self, wait_seconds: float):
+        with self._condition:
+            self.rate_limited += 1
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+            self.paused_until = max(self.paused_until, time.monotonic() + wait_seconds)
+
+# ======================
+# Batch Runner
+# ======================
+
+def percentile(values: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of values (0 if empty)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def roast_one(resume_id: str, resume_text: str, preferences: dict, limiter: AdaptiveLimiter,
+              max_retries: int) -> dict:
+    """
+    Roast a single resume, retrying retryable API errors with backoff.
+    This is the only retry layer in a batch: run_batch turns off the LLM guard's own retries.
+    """
+    start_time = time.perf_counter()
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            roast_result, processing_stats = roast_resume(resume_text, preferences=preferences)
+        finally:
+            limiter.release()
+
+        if processing_stats['success']:
+            limiter.on_success()
+            break
+        if not processing_stats.get('retryable') or attempt == max_retries:
+            break
+        # Honor Retry-After when the API sends it, otherwise jittered exponential backoff
+        wait_seconds = processing_stats.get('retry_after') or min(60, 2 ** attempt) * random.uniform(0.5, 1.5)
+        limiter.on_rate_limit(wait_seconds)
+
+    return {
+        'id': resume_id,
+        'success': processing_stats['success'],
+        'roast': roast_result if processing_stats['success'] else None,
+        'error': processing_stats.get('error'),
+        'attempts': attempt + 1,
+        'latency': time.perf_counter() - start_time,
+        'cache_hit': processing_stats.get('cache_hit', False),
+        'sent_tokens': processing_stats.get('sent_tokens')
+    }
+
+def run_batch(source: str, output_path: str, concurrency: int, preferences: dict, max_retries: int) -> dict:
+    """
+    Roast everything in source that isn't already in output_path; returns a summary
+    """
+    completed = load_completed_ids(output_path)
+    limiter = AdaptiveLimiter(concurrency)
+    # roast_one owns retries so every rate limit reaches the limiter; without this the
+    # guard would retry each attempt too (up to (max_retries + 1) x (LLM_MAX_RETRIES + 1) calls)
+    get_llm_guard().max_retries = 0
+    write_lock = threading.Lock()
+    results = []
+    skipped = 0
+    start_time = time.perf_counter()
+
+    with open(output_path, 'a', encoding='utf-8') as output, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def record(result):
+            with write_lock:
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+                results.append(result)
+                print(f"[{len(results)}] {result['id']}: {'ok' if result['success'] else 'FAILED'} "
+                      f"({result['latency']:.2f}s){'' if result['success'] else ' - ' + str(result['error'])}",
+                      file=sys.stderr)
+
+        def handle(resume_id, resume_text):
+            record(roast_one(resume_id, resume_text, preferences, limiter, max_retries))
+
+        futures = []
+        for resume_id, resume_text, error in load_resumes(source):
+            if resume_id in completed:
+                skipped += 1
+                continue
+            if error:
+                record({'id': resume_id, 'success': False, 'roast': None, 'error': error, 'attempts': 0,
+                        'latency': 0.0, 'cache_hit': False, 'sent_tokens': None})
+                continue
+            futures.append(pool.submit(handle, resume_id, resume_text))
+        for future in futures:
+            future.result()
+
+    wall_time = time.perf_counter() - start_time
+    latencies = [result['latency'] for result in results]
+    return {
+        'processed': len(results),
+        'succeeded': sum(1 for result in results if result['success']),
+        'failed': sum(1 for result in results if not result['success']),
+        'skipped_from_checkpoint': skipped,
+        'cache_hits': sum(1 for result in results if result['cache_hit']),
+        'rate_limited': limiter.rate_limited,
+        'wall_time': wall_time,
+        'throughput_per_minute': len(results) / wall_time * 60 if wall_time else 0.0,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'latency_p99': percentile(latencies, 99)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Roast a batch of resumes without the Streamlit UI")
+    parser.add_argument('source', help="Directory of PDF/TXT resumes or a JSONL file")
+    parser.add_argument('--output', default='roasts.jsonl', help="JSONL results file (also the resume checkpoint)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help=f"Max roasts in flight (also capped by LLM_MAX_IN_FLIGHT, currently {LLM_MAX_IN_FLIGHT})")
+    parser.add_argument('--style', default='balanced', choices=['gentle', 'balanced', 'savage'])
+    parser.add_argument('--humor', default='medium', choices=['low', 'medium', 'high'])
+    parser.add_argument('--max-retries', type=int, default=5, help="Retries per resume for rate limits/outages")
+    args = parser.parse_args()
+    if args.concurrency > LLM_MAX_IN_FLIGHT:
+        print(f"⚠️ --concurrency {args.concurrency} is above LLM_MAX_IN_FLIGHT={LLM_MAX_IN_FLIGHT}; "
+              f"only {LLM_MAX_IN_FLIGHT} roasts will reach the API at once", file=sys.stderr)
+
+    summary = run_batch(
+        args.source,
+        args.output,
+        concurrency=args.concurrency,
+        preferences={'roast_style': args.style, 'humor_level': args.humor},
+        max_retries=args.max_retries
+    )
+
+    print("\n🔥 Batch roast complete")
+    print(f"  Processed:   {summary['processed']} ({summary['succeeded']} ok, {summary['failed']} failed, "
+          f"{summary['skipped_from_checkpoint']} already done)")
+    print(f"  Wall time:   {summary['wall_time']:.1f}s")
+    print(f"  Throughput:  {summary['throughput_per_minute']:.1f} roasts/min")
+    print(f"  Latency:     p50 {summary['latency_p50']:.2f}s | p95 {summary['latency_p95']:.2f}s | "
+          f"p99 {summary['latency_p99']:.2f}s")
+    print(f"  Cache hits:  {summary['cache_hits']} | Rate limited: {summary['rate_limited']} times")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+End-to-end benchmark and load test for the roast flow.
+
+Drives main.py through Streamlit's AppTest harness with a stub Supabase
+client and the fake LLM backend, then reports per-rerun wall time, Supabase
+round trips per render, PDF parse time and roast latency percentiles.
+
+Usage:
+    python benchmarks/bench_roast_flow.py --iterations 20
+    python benchmarks/bench_roast_flow.py --users 8 --iterations 5 --output bench.json
+    python benchmarks/bench_roast_flow.py --compare bench.json   # diff against an earlier run
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import threading
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import stubs
+from streamlit.testing.v1 import AppTest
+
+# ======================
+# App Under Test
+# ======================
+
+def app_script(repo_root: str, bench_dir: str, user_number: int):
+    # Runs inside AppTest: install stubs, then execute main.py as the page script
+    import sys
+    import runpy
+    for path in (repo_root, bench_dir):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import stubs
+    import threading
+    # Name the script thread so Supabase round trips are attributed to this user's renders
+    threading.current_thread().name = stubs.script_thread_name(user_number)
+    stubs.install(user_number)
+    stubs.instrument_pdf_extraction()
+    runpy.run_path(f"{repo_root}/main.py", run_name="__main__")
+
+# AppTest swaps process-global runtime state (Runtime._instance, st.secrets) for the
+# duration of a run, and from_function() rewrites a shared temp script file, so
+# creating and rerunning apps for different simulated users must not overlap.
+# Roast jobs still run concurrently in the app's worker pool.
+_apptest_lock = threading.Lock()
+
+def timed_run(at: AppTest, user_number: int, timeout: float) -> tuple:
+    """
+    Run one rerun; returns (wall_time, round trips made by the render itself)
+    """
+    script_thread = stubs.script_thread_name(user_number)
+    with _apptest_lock:
+        trips_before = stubs.round_trips(script_thread)
+        start = time.perf_counter()
+        at.run(timeout=timeout)
+        wall_time = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+    return wall_time, stubs.round_trips(script_thread) - trips_before
+
+def roast_finished(at: AppTest) -> bool:
+    return any('survived the roast' in element.value for element in at.success)
+
+def run_user_session(user_number: int, iterations: int, pdf_pages: int, timeout: float,
+                     samples: dict, lock: threading.Lock, poll_interval: float = 0.1):
+    """
+    One simulated user: render the roast page, upload, change a setting, roast; repeat
+    """
+    def record(metric, value):
+        with lock:
+            samples[metric].append(value)
+
+    for iteration in range(iterations):
+        with _apptest_lock:
+            at = AppTest.from_function(app_script, default_timeout=timeout,
+                                       args=(REPO_ROOT, BENCH_DIR, user_number))
+        at.session_state['page'] = 'roast'
+
+        wall_time, trips = timed_run(at, user_number, timeout)
+        record('rerun_initial_render', wall_time)
+        record('round_trips_initial_render', trips)
+
+        # Unique marker per upload so the roast cache doesn't hide LLM latency
+        marker = f"u{user_number}-i{iteration}-{time.time_ns()}"
+        if pdf_pages:
+            upload = (f"resume-{marker}.pdf", stubs.make_sample_pdf(pdf_pages, marker), "application/pdf")
+        else:
+            upload = (f"resume-{marker}.txt", stubs.make_sample_text(marker).encode('utf-8'), "text/plain")
+        at.file_uploader[0].set_value(upload)
+        wall_time, trips = timed_run(at, user_number, timeout)
+        record('rerun_upload', wall_time)
+        record('round_trips_upload', trips)
+
+        at.selectbox[0].select(['gentle', 'balanced', 'savage'][iteration % 3])
+        wall_time, trips = timed_run(at, user_number, timeout)
+        record('rerun_widget_change', wall_time)
+        record('round_trips_widget_change', trips)
+
+        roast_button = next(button for button in at.button if 'Roast my resume' in button.label)
+        roast_button.click()
+        wall_time, trips = timed_run(at, user_number, timeout)
+        record('rerun_roast_submit', wall_time)
+        record('round_trips_roast', trips)
+        
+        # The roast runs as a background job; rerun like the page's polling fragment until it lands
+        latency = wall_time
+        deadline = time.perf_counter() + timeout
+        while not roast_finished(at):
+            if time.perf_counter() > deadline:
+                raise RuntimeError("Roast job did not finish before the timeout")
+            time.sleep(poll_interval)
+            wall_time, trips = timed_run(at, user_number, timeout)
+            latency += poll_interval + wall_time
+            record('rerun_roast_poll', wall_time)
+            record('round_trips_roast_poll', trips)
+        record('roast_latency', latency)
+
+# ======================
+# Reporting
+# ======================
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(values: list) -> dict:
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else 0.0,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else 0.0
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+def compare(current: dict, baseline: dict):
+    """
+    Print p50/p95 deltas against an earlier results file
+    """
+    print(f"\nCompared with {baseline.get('revision', '?')} ({baseline.get('timestamp', '?')}):")
+    for metric, stats in current['metrics'].items():
+        before = baseline.get('metrics', {}).get(metric)
+        if not before:
+            continue
+        for key in ('p50', 'p95'):
+            if before[key]:
+                change = (stats[key] - before[key]) / before[key] * 100
+                flag = '  ⚠️' if change > 10 else ''
+                print(f"  {metric:<28} {key}: {before[key]:.4f} -> {stats[key]:.4f} ({change:+.1f}%){flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and load-test the roast flow offline")
+    parser.add_argument('--users', type=int, default=1, help="Concurrent simulated users (load mode when > 1)")
+    parser.add_argument('--iterations', type=int, default=10, help="Roasts per user")
+    parser.add_argument('--pdf-pages', type=int, default=2, help="Pages per uploaded PDF (0 uploads TXT)")
+    parser.add_argument('--llm-first-token-ms', type=float, default=300.0)
+    parser.add_argument('--llm-tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--supabase-latency-ms', type=float, default=20.0, help="Simulated latency per round trip")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-rerun timeout in seconds")
+    parser.add_argument('--output', default='bench_results.json', help="Machine-readable results file")
+    parser.add_argument('--compare', help="Earlier results file to diff against")
+    args = parser.parse_args()
+
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_FIRST_TOKEN_MS': str(args.llm_first_token_ms),
+        'FAKE_LLM_TOKENS_PER_SECOND': str(args.llm_tokens_per_second),
+        'FAKE_LLM_ERROR_RATE': str(args.llm_error_rate),
+        'SUPABASE_URL': 'http://stub.supabase.local',
+        'SUPABASE_KEY': 'stub-key',
+        'PROCESSING_LOG_SPOOL_PATH': ''
+    })
+    stubs.SUPABASE_LATENCY = args.supabase_latency_ms / 1000.0
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    errors = []
+
+    def user_thread(user_number):
+        try:
+            run_user_session(user_number, args.iterations, args.pdf_pages, args.timeout, samples, lock)
+        except Exception as e:
+            errors.append(f"user {user_number}: {e}")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user_thread, args=(n,), name=f"bench-user-{n}")
+               for n in range(1, args.users + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    samples['pdf_parse_time'] = stubs.pdf_timings()
+    results = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'wall_time': wall_time,
+        'roasts_per_minute': len(samples['roast_latency']) / wall_time * 60 if wall_time else 0.0,
+        'supabase_calls_by_kind': stubs.round_trips_by_kind(),
+        'errors': errors,
+        'metrics': {metric: summarize(values) for metric, values in sorted(samples.items())}
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(results, output, indent=2)
+
+    print(f"\n🔥 Roast flow benchmark ({args.users} user(s) x {args.iterations} roasts, rev {results['revision']})")
+    for metric, stats in results['metrics'].items():
+        print(f"  {metric:<28} p50 {stats['p50']:.4f}  p95 {stats['p95']:.4f}  p99 {stats['p99']:.4f}  (n={stats['count']})")
+    print(f"  Throughput: {results['roasts_per_minute']:.1f} roasts/min over {wall_time:.1f}s")
+    if errors:
+        print(f"  ⚠️ {len(errors)} user session(s) failed: {errors[:3]}")
+    print(f"  Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            compare(results, json.load(baseline_file))
+
+if __name__ == "__main__":
+    main()
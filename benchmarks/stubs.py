@@ -0,0 +1,260 @@
+"""
+Stand-ins for Supabase and the auth component used by the benchmark suite.
+
+The stub client keeps tables in memory, answers the same query-builder calls
+main.py makes, and counts every round trip per thread so a benchmark can tell
+page-render traffic apart from the background log writer.
+"""
+import time
+import types
+import threading
+from collections import Counter
+
+BENCH_USER_ID = "00000000-0000-4000-8000-000000000001"
+
+# Simulated network latency per Supabase round trip (seconds)
+SUPABASE_LATENCY = 0.0
+
+_calls_lock = threading.Lock()
+_calls = Counter()
+
+def record_call(kind: str):
+    with _calls_lock:
+        _calls[(threading.current_thread().name, kind)] += 1
+
+def round_trips(thread_name: str = None) -> int:
+    """
+    Supabase round trips so far made by the named thread (all threads if None)
+    """
+    with _calls_lock:
+        return sum(count for (thread, _), count in _calls.items() if thread_name in (None, thread))
+
+def round_trips_by_kind() -> dict:
+    with _calls_lock:
+        totals = Counter()
+        for (_, kind), count in _calls.items():
+            totals[kind] += count
+        return dict(totals)
+
+class StubQuery:
+    def __init__(self, client, table_name: str):
+        self.client = client
+        self.table_name = table_name
+        self.operation = 'select'
+        self.payload = None
+        self.filters = []
+        self.order_by = None
+        self.row_limit = None
+
+    def select(self, *columns, **options):
+        return self
+
+    def insert(self, payload, **options):
+        self.operation, self.payload = 'insert', payload
+        return self
+
+    def update(self, payload, **options):
+        self.operation, self.payload = 'update', payload
+        return self
+
+    def upsert(self, payload, **options):
+        self.operation, self.payload = 'upsert', payload
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        record_call(f"{self.table_name}.{self.operation}")
+        if SUPABASE_LATENCY:
+            time.sleep(SUPABASE_LATENCY)
+        with self.client.lock:
+            rows = self.client.tables.setdefault(self.table_name, [])
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            if self.operation == 'insert':
+                rows.extend(dict(row) for row in payload)
+                return types.SimpleNamespace(data=payload)
+            if self.operation == 'upsert':
+                stored = []
+                for row in payload:
+                    existing = [r for r in rows if r.get('user_id') == row.get('user_id')]
+                    if existing:
+                        existing[0].update(row)
+                        stored.append(dict(existing[0]))
+                    else:
+                        rows.append(dict(row))
+                        stored.append(dict(row))
+                return types.SimpleNamespace(data=stored)
+            matched = [r for r in rows if all(r.get(c) == v for c, v in self.filters)]
+            if self.operation == 'update':
+                for row in matched:
+                    row.update(self.payload)
+            if self.order_by:
+                matched.sort(key=lambda r: r.get(self.order_by[0]) or '', reverse=self.order_by[1])
+            if self.row_limit:
+                matched = matched[:self.row_limit]
+            return types.SimpleNamespace(data=[dict(r) for r in matched])
+
+class StubRPC:
+    def __init__(self, client, function_name: str, params: dict):
+        self.client = client
+        self.function_name = function_name
+        self.params = params or {}
+
+    def execute(self):
+        record_call(f"rpc.{self.function_name}")
+        if SUPABASE_LATENCY:
+            time.sleep(SUPABASE_LATENCY)
+        if self.function_name == 'get_user_processing_stats':
+            with self.client.lock:
+                rows = [r for r in self.client.tables.get('processing_logs', [])
+                        if r.get('user_id') == self.params.get('target_user_id')]
+            times = [r.get('processing_time_seconds', 0) for r in rows]
+            return types.SimpleNamespace(data=[{
+                'total_roasts': len(rows),
+                'successful_roasts': sum(1 for r in rows if r.get('success')),
+                'avg_processing_time': sum(times) / len(times) if times else 0
+            }])
+        if self.function_name == 'get_user_page_data':
+            user_id = self.params.get('target_user_id')
+            with self.client.lock:
+                rows = [r for r in self.client.tables.get('processing_logs', []) if r.get('user_id') == user_id]
+                preferences = [r for r in self.client.tables.get('user_preferences', []) if r.get('user_id') == user_id]
+            times = [r.get('processing_time_seconds', 0) for r in rows]
+            recent = sorted(rows, key=lambda r: r.get('processed_at') or '', reverse=True)[:3]
+            return types.SimpleNamespace(data=[{
+                'total_roasts': len(rows),
+                'successful_roasts': sum(1 for r in rows if r.get('success')),
+                'avg_processing_time': sum(times) / len(times) if times else 0,
+                'recent_activity': [{'file_type': r.get('file_type'), 'processed_at': r.get('processed_at')} for r in recent],
+                'preferences': preferences[0]['preferences'] if preferences else {}
+            }])
+        return types.SimpleNamespace(data=[])
+
+class StubSupabaseClient:
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def table(self, table_name: str):
+        return StubQuery(self, table_name)
+
+    def rpc(self, function_name: str, params: dict = None):
+        return StubRPC(self, function_name, params)
+
+_stub_client = None
+
+def create_client(url, key, options=None):
+    # One shared in-memory database, whichever user's token the client carries
+    global _stub_client
+    if _stub_client is None:
+        _stub_client = StubSupabaseClient()
+    return _stub_client
+
+def script_thread_name(user_number: int) -> str:
+    return f"bench-user-{user_number}-script"
+
+def bench_session(user_number: int = 1) -> dict:
+    """
+    Fake authenticated session as returned by streamlit_supabase_auth.login_form
+    """
+    user_id = BENCH_USER_ID[:-4] + f"{user_number:04d}"
+    return {'access_token': f"bench-token-{user_number}", 'user': {'id': user_id, 'email': f"bench{user_number}@example.com"}}
+
+def install(user_number: int = 1):
+    """
+    Patch supabase and streamlit_supabase_auth before main.py runs
+    """
+    import supabase
+    import streamlit_supabase_auth
+    supabase.create_client = create_client
+    streamlit_supabase_auth.login_form = lambda **kwargs: bench_session(user_number)
+    streamlit_supabase_auth.logout_button = lambda *args, **kwargs: None
+
+# ======================
+# PDF Timing
+# ======================
+
+_pdf_timings = []
+
+def instrument_pdf_extraction():
+    """
+    Wrap pdf_extractor.extract_pdf_text to record how long each parse takes
+    """
+    import pdf_extractor
+    if getattr(pdf_extractor.extract_pdf_text, 'instrumented', False):
+        return
+    original = pdf_extractor.extract_pdf_text
+
+    def timed_extract_pdf_text(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            with _calls_lock:
+                _pdf_timings.append(time.perf_counter() - start)
+
+    timed_extract_pdf_text.instrumented = True
+    pdf_extractor.extract_pdf_text = timed_extract_pdf_text
+
+def pdf_timings() -> list:
+    with _calls_lock:
+        return list(_pdf_timings)
+
+# ======================
+# Sample Resumes
+# ======================
+
+def make_sample_pdf(page_count: int, marker: str = "") -> bytes:
+    """
+    Build a minimal multi-page text PDF without any PDF-writing dependency
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = ' '.join(f"{3 + 2 * i} 0 R" for i in range(page_count))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+    font_id = 3 + 2 * page_count
+    for i in range(page_count):
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                        f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>").encode())
+        lines = [sample_resume_line(i * 40 + j) for j in range(40)]
+        if i == 0:
+            lines.insert(0, f"Jordan Sample {marker}")
+        text_ops = ' '.join(f"({line}) Tj 0 -16 Td" for line in lines)
+        stream = f"BT /F1 10 Tf 50 760 Td {text_ops} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF".encode()
+    return pdf
+
+SAMPLE_LINES = [
+    "SUMMARY", "Results-driven team player with a proven track record of synergy.",
+    "EXPERIENCE", "Senior Ninja, Acme Corp - leveraged cross-functional paradigms.",
+    "Managed stakeholders and thought outside the box daily.",
+    "SKILLS", "Microsoft Word, Excel, PowerPoint, Python, communication.",
+    "EDUCATION", "B.S. in Business Administration, State University.",
+    "HOBBIES", "Networking, hustling, reading productivity blogs."
+]
+
+def sample_resume_line(index: int) -> str:
+    return SAMPLE_LINES[index % len(SAMPLE_LINES)]
+
+def make_sample_text(marker: str = "", line_count: int = 60) -> str:
+    return '\n'.join([f"Jordan Sample {marker}"] + [sample_resume_line(i) for i in range(line_count)])
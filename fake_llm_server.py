@@ -0,0 +1,161 @@
+"""
+Local OpenAI-compatible chat completions server backed by FakeLLMBackend.
+
+Point the app (or batch_roast.py) at it to benchmark and load-test the full
+HTTP path without touching the real API:
+
+    python fake_llm_server.py --port 8089 --first-token-ms 400 --error-rate 0.05
+    OPENAI_API_BASE=http://localhost:8089/v1 OPENAI_API_KEY=fake streamlit run main.py
+"""
+import json
+import time
+import uuid
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+from llm_backends import FakeLLMBackend
+
+class FakeChatCompletionsHandler(BaseHTTPRequestHandler):
+    """
+    Handles POST /v1/chat/completions (plain and stream=true server-sent events)
+    """
+
+    backend: FakeLLMBackend = None
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        messages = request.get('messages', [])
+        max_tokens = request.get('max_tokens') or 350
+        temperature = request.get('temperature', 1.0)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get('model', self.backend.model_name)
+
+        chunks = self.backend.stream(messages, max_tokens, temperature)
+        try:
+            # The first chunk is where injected errors surface
+            first_chunk = next(chunks, '')
+        except openai.error.OpenAIError as e:
+            self._send_error(e)
+            return
+
+        if request.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            for content in self._prepend(first_chunk, chunks):
+                self._send_event({
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': content}, 'finish_reason': None}]
+                })
+            self._send_event({
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+            })
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        content = ''.join(self._prepend(first_chunk, chunks))
+        prompt_tokens = sum(len(message.get('content', '').split()) for message in messages)
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(content.split()),
+                'total_tokens': prompt_tokens + len(content.split())
+            }
+        })
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet
+        pass
+
+    @staticmethod
+    def _prepend(first_chunk, chunks):
+        if first_chunk:
+            yield first_chunk
+        yield from chunks
+
+    def _send_error(self, error: Exception):
+        status = getattr(error, 'http_status', None) or 504
+        error_type = 'rate_limit_exceeded' if status == 429 else 'server_error'
+        body = json.dumps({'error': {'message': str(error), 'type': error_type}}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for header, value in (getattr(error, 'headers', None) or {}).items():
+            self.send_header(header, str(value))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, payload: dict):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+def serve(backend: FakeLLMBackend, host: str = '127.0.0.1', port: int = 8089) -> ThreadingHTTPServer:
+    """
+    Create the server (call serve_forever() on the result, e.g. from a thread)
+    """
+    handler = type('BoundFakeChatCompletionsHandler', (FakeChatCompletionsHandler,), {'backend': backend})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server for offline load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--first-token-ms', type=float, default=400.0, help="Mean time to first token")
+    parser.add_argument('--latency-distribution', default='lognormal', choices=['fixed', 'uniform', 'lognormal'])
+    parser.add_argument('--latency-jitter', type=float, default=0.5, help="Lognormal sigma")
+    parser.add_argument('--tokens-per-second', type=float, default=60.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument('--error-kind', default='rate_limit', choices=['rate_limit', 'unavailable', 'timeout'])
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After sent with injected errors")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    backend = FakeLLMBackend(
+        first_token_ms=args.first_token_ms,
+        latency_distribution=args.latency_distribution,
+        latency_jitter=args.latency_jitter,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_kind=args.error_kind,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    server = serve(backend, args.host, args.port)
+    print(f"🔥 Fake LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
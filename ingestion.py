@@ -0,0 +1,141 @@
+"""
+Bounded, streaming ingestion of uploaded resumes.
+
+Uploads are read in fixed-size chunks against a hard byte limit. TXT files are
+decoded incrementally with encoding detection (BOM, UTF-16, UTF-8, else
+Windows-1252) and PDFs are extracted page by page; both stop as soon as
+enough text has been collected for the prompt's token budget. Every upload
+reports the memory ingestion held at its peak.
+"""
+import io
+import sys
+import time
+import codecs
+
+import pdf_extractor
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Checked longest first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+class UploadTooLargeError(ValueError):
+    """
+    The upload is over the byte limit
+    """
+
+    def __init__(self, max_bytes: int):
+        limit = f"{max_bytes / (1024 * 1024):.0f} MB" if max_bytes >= 1024 * 1024 else f"{max_bytes / 1024:.0f} KB"
+        super().__init__(f"File is larger than the {limit} limit")
+        self.max_bytes = max_bytes
+
+def detect_encoding(head: bytes) -> str:
+    """
+    Guess a text encoding from the first bytes of a file
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    # UTF-16 without a BOM: every other byte of ASCII text is NUL. Checked before
+    # UTF-8, which accepts NUL bytes and so would decode it as garbage
+    if head.count(b'\x00') > len(head) // 4:
+        return 'utf-16-le' if head[1::2].count(0) > head[0::2].count(0) else 'utf-16-be'
+    try:
+        # Not final: the chunk may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    return 'cp1252'
+
+def ingest_text(stream, max_bytes: int, max_chars: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[str, dict]:
+    """
+    Decode a text file from a binary stream chunk by chunk, raising
+    UploadTooLargeError past max_bytes and stopping once max_chars are collected.
+    Undecodable bytes become U+FFFD instead of failing the upload.
+    Returns tuple of (text, ingest_stats)
+    """
+    start_time = time.perf_counter()
+    decoder = None
+    encoding = 'utf-8'
+    parts = []
+    chars = 0
+    bytes_read = 0
+    held_bytes = 0
+    peak_bytes = 0
+    text_truncated = False
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        bytes_read += len(chunk)
+        if bytes_read > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        if decoder is None:
+            encoding = detect_encoding(chunk)
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        part = decoder.decode(chunk)
+        parts.append(part)
+        chars += len(part)
+        held_bytes += sys.getsizeof(part)
+        peak_bytes = max(peak_bytes, held_bytes + len(chunk))
+        if chars >= max_chars:
+            text_truncated = chars > max_chars or bool(stream.read(1))
+            break
+    if decoder is not None and not text_truncated:
+        parts.append(decoder.decode(b'', final=True))
+
+    text = ''.join(parts)[:max_chars]
+    peak_bytes = max(peak_bytes, held_bytes + sys.getsizeof(text))
+    ingest_stats = {
+        'file_type': 'txt',
+        'encoding': encoding,
+        'bytes_read': bytes_read,
+        'chars': len(text),
+        'replaced_chars': text.count('\ufffd'),
+        'text_truncated': text_truncated,
+        'peak_memory_bytes': peak_bytes,
+        'ingest_time': time.perf_counter() - start_time
+    }
+    return text, ingest_stats
+
+def ingest_pdf(file_bytes: bytes, max_bytes: int, max_chars: int, extract=None, **extract_options) -> tuple[str, dict]:
+    """
+    Extract PDF text (pdf_extractor.extract_pdf_text, or `extract` if given) up to
+    max_chars. PDFs need random access, so the file itself is held in memory and
+    counted in peak_memory_bytes.
+    Returns tuple of (text, ingest_stats) where ingest_stats includes the extraction stats
+    """
+    if len(file_bytes) > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+    start_time = time.perf_counter()
+    extract = extract or pdf_extractor.extract_pdf_text
+    text, extraction_stats = extract(file_bytes, max_chars=max_chars, **extract_options)
+    ingest_stats = dict(extraction_stats)
+    ingest_stats.update({
+        'file_type': 'pdf',
+        'encoding': None,
+        'bytes_read': len(file_bytes),
+        'chars': len(text),
+        'replaced_chars': 0,
+        'peak_memory_bytes': len(file_bytes) + extraction_stats.get('text_memory_bytes', sys.getsizeof(text)),
+        'ingest_time': time.perf_counter() - start_time
+    })
+    return text, ingest_stats
+
+def ingest_bytes(content: bytes, max_bytes: int, max_chars: int, is_pdf: bool = None, **extract_options) -> tuple[str, dict]:
+    """
+    Ingest an in-memory file, detecting PDFs by their header unless is_pdf is given
+    """
+    if is_pdf is None:
+        is_pdf = content.startswith(b'%PDF')
+    if is_pdf:
+        return ingest_pdf(content, max_bytes, max_chars, **extract_options)
+    return ingest_text(io.BytesIO(content), max_bytes, max_chars)
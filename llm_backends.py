@@ -0,0 +1,389 @@
+import re
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from startup import lazy_import
+
+# ======================
+# LLM Backend Interface
+# ======================
+
+class LLMBackend:
+    """
+    Chat-completion backend used by roast_resume.
+    Implementations raise openai.error exceptions on failure so retry and
+    rate-limit handling works the same for every backend.
+    """
+
+    model_name = "unknown"
+
+    def complete(self, messages: list, max_tokens: int, temperature: float) -> str:
+        """
+        Return the full completion text
+        """
+        raise NotImplementedError
+
+    def stream(self, messages: list, max_tokens: int, temperature: float):
+        """
+        Yield completion text chunks as they are generated
+        """
+        raise NotImplementedError
+
+class OpenAIBackend(LLMBackend):
+    """
+    OpenAI chat completions (set OPENAI_API_BASE to point it at fake_llm_server.py).
+    The openai package is imported on the first request.
+    """
+
+    def __init__(self, model: str = "gpt-3.5-turbo", api_key: str = None):
+        self.model_name = model
+        self.api_key = api_key
+
+    def complete(self, messages: list, max_tokens: int, temperature: float) -> str:
+        response = lazy_import('openai').ChatCompletion.create(
+            api_key=self.api_key,
+            model=self.model_name,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content if response.choices else ""
+
+    def stream(self, messages: list, max_tokens: int, temperature: float):
+        response = lazy_import('openai').ChatCompletion.create(
+            api_key=self.api_key,
+            model=self.model_name,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        for chunk in response:
+            content = chunk.choices[0].delta.get('content') if chunk.choices else None
+            if content:
+                yield content
+
+# ======================
+# Fake Backend (offline benchmarking / load testing)
+# ======================
+
+FAKE_ROAST_OPENERS = [
+    "This resume reads like a LinkedIn post that gained sentience and immediately regretted it.",
+    "I've seen more personality in a terms-of-service agreement.",
+    "Congratulations, you've invented a new genre: corporate fan fiction.",
+    "Recruiters spend six seconds on a resume. This one will get a refund."
+]
+FAKE_ROAST_JABS = [
+    "'Team player' - the official slogan of people who hide in group projects.",
+    "Listing Microsoft Word as a skill is a bold move in this century.",
+    "'Results-driven' with zero results listed. Incredible.",
+    "Your buzzword density could power a small startup's pitch deck.",
+    "The formatting suggests you and the tab key are no longer on speaking terms.",
+    "'Detail-oriented', says the document with three fonts."
+]
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Deterministic stand-in for the OpenAI API. The same prompt always gets the
+    same roast; latency, streaming speed and error rate are configurable.
+
+    latency_distribution: 'fixed', 'uniform' (0..2x mean) or 'lognormal' (long tail, sigma=latency_jitter)
+    error_kind: 'rate_limit', 'unavailable' or 'timeout'
+    """
+
+    def __init__(self, model: str = "fake-roaster", first_token_ms: float = 400.0,
+                 latency_distribution: str = "lognormal", latency_jitter: float = 0.5,
+                 tokens_per_second: float = 60.0, error_rate: float = 0.0,
+                 error_kind: str = "rate_limit", retry_after: float = 1.0, seed: int = None):
+        self.model_name = model
+        self.first_token_ms = first_token_ms
+        self.latency_distribution = latency_distribution
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def complete(self, messages: list, max_tokens: int, temperature: float) -> str:
+        chunks = list(self.stream(messages, max_tokens, temperature))
+        return ''.join(chunks)
+
+    def stream(self, messages: list, max_tokens: int, temperature: float):
+        first_token_delay, should_fail = self._plan_request()
+        time.sleep(first_token_delay)
+        if should_fail:
+            raise self._make_error()
+        words = self._roast_for(messages).split(' ')[:max_tokens]
+        token_delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(token_delay)
+            yield word if index == len(words) - 1 else word + ' '
+
+    def _plan_request(self) -> tuple:
+        # Draw latency and failure under the lock so seeded runs are reproducible
+        with self._lock:
+            self.requests += 1
+            mean = self.first_token_ms / 1000.0
+            if self.latency_distribution == 'fixed':
+                delay = mean
+            elif self.latency_distribution == 'uniform':
+                delay = self._random.uniform(0, 2 * mean)
+            else:
+                delay = mean * self._random.lognormvariate(0, self.latency_jitter)
+            should_fail = self._random.random() < self.error_rate
+            if should_fail:
+                self.errors += 1
+            return delay, should_fail
+
+    def _make_error(self) -> Exception:
+        openai = lazy_import('openai')
+        headers = {'retry-after': str(self.retry_after)}
+        if self.error_kind == 'unavailable':
+            return openai.error.ServiceUnavailableError("Fake backend is unavailable", http_status=503, headers=headers)
+        if self.error_kind == 'timeout':
+            return openai.error.Timeout("Fake backend timed out")
+        return openai.error.RateLimitError("Fake backend rate limit reached", http_status=429, headers=headers)
+
+    @staticmethod
+    def _roast_for(messages: list) -> str:
+        prompt = messages[-1]['content'] if messages else ''
+        prompt_random = random.Random(hashlib.sha256(prompt.encode('utf-8')).digest())
+        return ' '.join([prompt_random.choice(FAKE_ROAST_OPENERS)] + prompt_random.sample(FAKE_ROAST_JABS, 3))
+
+def create_backend(name: str = "openai", model: str = "gpt-3.5-turbo", api_key: str = None,
+                   **fake_options) -> LLMBackend:
+    """
+    Build a backend by name ('openai' or 'fake')
+    """
+    if name == "fake":
+        return FakeLLMBackend(**fake_options)
+    if name == "openai":
+        return OpenAIBackend(model, api_key=api_key)
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+# ======================
+# Admission Control, Retry and Circuit Breaking
+# ======================
+
+RETRYABLE_ERROR_TYPES = {
+    'RateLimitError', 'ServiceUnavailableError', 'APIConnectionError', 'Timeout', 'TryAgain',
+    'CircuitOpenError', 'AdmissionTimeoutError'
+}
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the upstream while the circuit breaker is open
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"The roast machine is overheated - try again in {retry_after:.0f}s")
+        self.headers = {'retry-after': str(retry_after)}
+
+class AdmissionTimeoutError(Exception):
+    """
+    Raised when a request waited too long (or the wait queue is full) for an LLM slot
+    """
+
+    def __init__(self, message: str, retry_after: float = 5.0):
+        super().__init__(message)
+        self.headers = {'retry-after': str(retry_after)}
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Whether an LLM error is transient (rate limit, outage, timeout) rather than a bad request
+    """
+    return type(error).__name__ in RETRYABLE_ERROR_TYPES
+
+def retry_after_seconds(error: Exception):
+    """
+    Seconds the API asked us to wait before retrying (Retry-After or
+    x-ratelimit-reset-* headers on the error), or None if it didn't say
+    """
+    headers = getattr(error, 'headers', None) or {}
+    for header in ('retry-after', 'x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens'):
+        value = headers.get(header) or headers.get(header.title())
+        if not value:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            # Durations like "1m30s" or "250ms"
+            parts = re.findall(r'([\d.]+)(ms|s|m|h)', str(value))
+            if parts:
+                scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+                return sum(float(number) * scale[unit] for number, unit in parts)
+    return None
+
+class AdmissionController:
+    """
+    Process-wide cap on in-flight LLM requests with a FIFO wait queue,
+    so a traffic spike queues fairly instead of stampeding the API
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_waiting: int = 64, wait_timeout: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters = deque()
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def admit(self):
+        """
+        Wait for a slot (first come, first served); yields the seconds spent waiting
+        """
+        start = time.perf_counter()
+        ticket = object()
+        with self._condition:
+            if len(self._waiters) >= self.max_waiting:
+                self.rejected += 1
+                raise AdmissionTimeoutError("Too many roasts in line right now - please try again shortly")
+            self._waiters.append(ticket)
+            deadline = start + self.wait_timeout
+            while self._waiters[0] is not ticket or self.in_flight >= self.max_in_flight:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._waiters.remove(ticket)
+                    self.rejected += 1
+                    self._condition.notify_all()
+                    raise AdmissionTimeoutError("Waited too long for a free roaster - please try again shortly")
+                self._condition.wait(remaining)
+            self._waiters.popleft()
+            self.in_flight += 1
+            self.admitted += 1
+            # The next waiter may also fit if more than one slot is free
+            self._condition.notify_all()
+        try:
+            yield time.perf_counter() - start
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'in_flight': self.in_flight,
+                'waiting': len(self._waiters),
+                'admitted': self.admitted,
+                'rejected': self.rejected
+            }
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and fails fast
+    for `reset_timeout` seconds; then lets one trial request through (half-open)
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the upstream should not be called right now
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if self.state == 'open' and remaining > 0:
+                raise CircuitOpenError(remaining)
+            if self._trial_in_flight:
+                raise CircuitOpenError(max(remaining, 1.0))
+            self.state = 'half_open'
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        End a half-open trial that neither succeeded nor failed upstream (e.g. a bad request)
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+class LLMGuard:
+    """
+    Admission control + retry with jittered exponential backoff (honoring
+    Retry-After) + circuit breaking around a single LLM call
+    """
+
+    def __init__(self, admission: AdmissionController, breaker: CircuitBreaker, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0):
+        self.admission = admission
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after) * random.uniform(1.0, 1.2)
+        # "Full jitter" exponential backoff
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, request, can_retry=lambda: True):
+        """
+        Run request() under the guard. can_retry() lets streaming callers refuse a
+        retry once tokens have already been shown.
+        Returns tuple of (result, call_stats) where call_stats has queue_wait and attempts.
+        """
+        call_stats = {'queue_wait': 0.0, 'attempts': 0, 'backoff_time': 0.0}
+        for attempt in range(self.max_retries + 1):
+            call_stats['attempts'] = attempt + 1
+            try:
+                self.breaker.before_call()
+                try:
+                    with self.admission.admit() as queue_wait:
+                        call_stats['queue_wait'] += queue_wait
+                        result = request()
+                except Exception as e:
+                    if is_retryable_error(e) and not isinstance(e, AdmissionTimeoutError):
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.release_trial()
+                    raise
+                self.breaker.record_success()
+                return result, call_stats
+            except Exception as e:
+                e.call_stats = call_stats
+                if (isinstance(e, (CircuitOpenError, AdmissionTimeoutError)) or not is_retryable_error(e)
+                        or attempt == self.max_retries or not can_retry()):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                call_stats['backoff_time'] += delay
+                time.sleep(delay)
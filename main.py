@@ -1,13 +1,31 @@
 import os
 import json
 import io
+import time
+import uuid
+import hashlib
+import sqlite3
+import queue
+import atexit
+import re
+import threading
+import functools
+import bisect
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 import streamlit as st
-import openai
-import PyPDF2
+import pdf_extractor
+import ingestion
+import resume_analyzer
+import metrics
+from startup import lazy_import
+from llm_backends import (
+    LLMBackend, LLMGuard, AdmissionController, CircuitBreaker, CircuitOpenError, AdmissionTimeoutError,
+    create_backend, is_retryable_error, retry_after_seconds
+)
 from datetime import datetime
 from dotenv import load_dotenv
-from streamlit_supabase_auth import login_form, logout_button
-from supabase import create_client, Client
 
 # ======================
 # Configuration Settings
@@ -24,20 +42,130 @@ st.set_page_config(
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure OpenAI API
-openai.api_key = os.getenv('OPENAI_API_KEY')
+# OpenAI API key (the openai package itself is imported on the first roast)
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Model and prompt identifiers (bump ROAST_PROMPT_VERSION whenever the prompt text changes
+# so cached roasts produced by the old prompt are no longer served)
+ROAST_MODEL = "gpt-3.5-turbo"
+ROAST_PROMPT_VERSION = "v2"
+
+# Add the local pre-analysis findings (clichés, quantified bullets) to the roast prompt
+ROAST_PREANALYSIS_IN_PROMPT = os.getenv('ROAST_PREANALYSIS_IN_PROMPT', 'false').lower() == 'true'
+if ROAST_PREANALYSIS_IN_PROMPT:
+    ROAST_PROMPT_VERSION += "+prescan"
+
+# LLM backend: 'openai' (default) or 'fake' for offline benchmarking/load testing
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai')
+FAKE_LLM_FIRST_TOKEN_MS = float(os.getenv('FAKE_LLM_FIRST_TOKEN_MS', '400'))
+FAKE_LLM_LATENCY_DISTRIBUTION = os.getenv('FAKE_LLM_LATENCY_DISTRIBUTION', 'lognormal')
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', '60'))
+FAKE_LLM_ERROR_RATE = float(os.getenv('FAKE_LLM_ERROR_RATE', '0'))
+
+# Process-wide LLM admission control, retries and circuit breaker
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '8'))
+LLM_MAX_WAITING = int(os.getenv('LLM_MAX_WAITING', '64'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv('LLM_BACKOFF_BASE_SECONDS', '0.5'))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv('LLM_BACKOFF_MAX_SECONDS', '20'))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+
+# Roast cache settings
+ROAST_CACHE_MAX_ENTRIES = int(os.getenv('ROAST_CACHE_MAX_ENTRIES', '256'))
+ROAST_CACHE_DB_PATH = os.getenv('ROAST_CACHE_DB_PATH')  # Optional SQLite file for the on-disk tier
+ROAST_CACHE_TTL_SECONDS = int(os.getenv('ROAST_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# Background writer settings for processing_logs
+PROCESSING_LOG_BATCH_SIZE = int(os.getenv('PROCESSING_LOG_BATCH_SIZE', '20'))
+PROCESSING_LOG_FLUSH_INTERVAL = float(os.getenv('PROCESSING_LOG_FLUSH_INTERVAL', '2.0'))
+PROCESSING_LOG_QUEUE_SIZE = int(os.getenv('PROCESSING_LOG_QUEUE_SIZE', '1000'))
+PROCESSING_LOG_SPOOL_PATH = os.getenv('PROCESSING_LOG_SPOOL_PATH', 'processing_logs.spool.jsonl')
+
+# How often per-model request metrics are flushed to ai_model_metrics
+MODEL_METRICS_FLUSH_INTERVAL = float(os.getenv('MODEL_METRICS_FLUSH_INTERVAL', '30'))
+
+# How long a session reuses fetched preferences before asking Supabase again
+PREFERENCES_CACHE_TTL_SECONDS = float(os.getenv('PREFERENCES_CACHE_TTL_SECONDS', '300'))
+
+# How long a session reuses its sidebar stats before querying again
+USER_STATS_CACHE_TTL_SECONDS = float(os.getenv('USER_STATS_CACHE_TTL_SECONDS', '30'))
+
+# PDF extraction limits
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '50'))
+PDF_EXTRACTION_TIMEOUT_SECONDS = float(os.getenv('PDF_EXTRACTION_TIMEOUT_SECONDS', '20'))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '8'))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Max resume tokens sent to the model; longer resumes are compacted to fit
+ROAST_INPUT_TOKEN_BUDGET = int(os.getenv('ROAST_INPUT_TOKEN_BUDGET', '1500'))
 
-# Load Supabase credentials from Streamlit secrets
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
+# Upload ingestion: hard size limit, and how much text is read before stopping
+# (~8x the prompt budget at ~4 chars/token, so compaction can still pick the best sections)
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+INGEST_MAX_CHARS = int(os.getenv('INGEST_MAX_CHARS', str(ROAST_INPUT_TOKEN_BUDGET * 4 * 8)))
+
+# Port for the Prometheus /metrics endpoint (0 disables it) and the address it listens on;
+# the endpoint is unauthenticated, so only set a non-loopback host on a trusted network
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Stream roast tokens to the page as they arrive instead of waiting for the full completion
+ROAST_STREAMING = os.getenv('ROAST_STREAMING', 'true').lower() == 'true'
+
+# Background roast jobs: worker threads, how often the page polls a running job,
+# and how long finished jobs are kept so reruns/reconnects can pick them up
+ROAST_JOB_WORKERS = int(os.getenv('ROAST_JOB_WORKERS', '8'))
+ROAST_JOB_POLL_SECONDS = float(os.getenv('ROAST_JOB_POLL_SECONDS', '0.5'))
+ROAST_JOB_RETENTION_SECONDS = float(os.getenv('ROAST_JOB_RETENTION_SECONDS', '900'))
+
+# Opt-in speculation: after a roast, pre-generate this many other style/humor
+# variants in the background so switching preferences is instant (0 disables)
+ROAST_SPECULATIVE_VARIANTS = int(os.getenv('ROAST_SPECULATIVE_VARIANTS', '0'))
+ROAST_SPECULATIVE_WORKERS = int(os.getenv('ROAST_SPECULATIVE_WORKERS', '2'))
+
+# Import heavy dependencies in the background after the first page render of a new server process
+WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', 'false').lower() == 'true'
+WARM_UP_MODULES = ('supabase', 'streamlit_supabase_auth', 'openai', 'PyPDF2', 'tiktoken')
+
+def get_secret(name: str):
+    """Read a setting from Streamlit secrets, falling back to the environment (for headless tools)"""
+    try:
+        return st.secrets[name]
+    except Exception:
+        return os.getenv(name)
+
+# Supabase credentials and client are only loaded by the pages and functions that use them
+@functools.lru_cache(maxsize=None)
+def get_supabase_credentials() -> tuple:
+    """(url, key) for Supabase, read from Streamlit secrets on first use"""
+    return get_secret("SUPABASE_URL"), get_secret("SUPABASE_KEY")
 
-# Initialize Supabase client
 @st.cache_resource
-def init_supabase() -> Client:
-    """Initialize Supabase client"""
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+def init_supabase():
+    """Initialize Supabase client (imports the supabase package on first call)"""
+    supabase_url, supabase_key = get_supabase_credentials()
+    return lazy_import('supabase').create_client(supabase_url, supabase_key)
+
+def get_supabase():
+    """Shared Supabase client; None for headless tools (e.g. batch_roast.py) without credentials"""
+    supabase_url, supabase_key = get_supabase_credentials()
+    return init_supabase() if supabase_url and supabase_key else None
 
-supabase = init_supabase()
+@st.cache_resource(max_entries=256, ttl=3600)
+def get_user_supabase(access_token: str):
+    """
+    Supabase client that sends a signed-in user's access token, so RLS and
+    auth.uid() see that user (the shared client only carries the anon key)
+    """
+    supabase_url, supabase_key = get_supabase_credentials()
+    supabase = lazy_import('supabase')
+    return supabase.create_client(supabase_url, supabase_key, options=supabase.ClientOptions(
+        headers={'Authorization': f"Bearer {access_token}"},
+        auto_refresh_token=False,
+        persist_session=False
+    ))
 
 # Initialize session state for navigation
 if "page" not in st.session_state:
@@ -46,45 +174,652 @@ if "page" not in st.session_state:
 if "user_session" not in st.session_state:
     st.session_state.user_session = None
 
+if "preferences_cache" not in st.session_state:
+    st.session_state.preferences_cache = {}
+
+if "user_stats_cache" not in st.session_state:
+    st.session_state.user_stats_cache = {}
+
+if "roast_job_id" not in st.session_state:
+    st.session_state.roast_job_id = None
+
+if "rerun_costs" not in st.session_state:
+    st.session_state.rerun_costs = {}  # scope -> {'runs': n, 'seconds': total}
+
+if "partial_extractions" not in st.session_state:
+    st.session_state.partial_extractions = {}  # upload file_id -> timed-out (text, stats)
+
+# ======================
+# Latency Instrumentation
+# ======================
+
+STAGE_METRIC = 'roast_stage_duration_seconds'
+SUPABASE_METRIC = 'supabase_request_duration_seconds'
+metrics.REGISTRY.describe(STAGE_METRIC, "Time spent in each stage of a page render or roast")
+metrics.REGISTRY.describe(SUPABASE_METRIC, "Supabase round trip time by table and operation")
+metrics.REGISTRY.describe('llm_time_to_first_token_seconds', "Time from roast start to the first streamed token")
+
+def time_stage(stage: str):
+    """
+    Context manager timing one stage (monotonic clock) into the stage histogram
+    """
+    return metrics.REGISTRY.span(STAGE_METRIC, stage=stage)
+
+RERUN_METRIC = 'page_rerun_duration_seconds'
+metrics.REGISTRY.describe(RERUN_METRIC, "Script time per rerun: 'page' for a full rerun, else the fragment that reran alone")
+
+def track_rerun_cost(scope: str):
+    """
+    Decorator recording the script time of each rerun of a page ('page') or fragment (its name).
+    A fragment only counts when it reruns on its own; during a full page rerun its time is part of 'page'.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if scope != 'page' and st.session_state.get('rerun_cost_scope'):
+                return func(*args, **kwargs)
+            st.session_state.rerun_cost_scope = scope
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                st.session_state.rerun_cost_scope = None
+                metrics.REGISTRY.observe(RERUN_METRIC, elapsed, scope=scope)
+                cost = st.session_state.rerun_costs.setdefault(scope, {'runs': 0, 'seconds': 0.0})
+                cost['runs'] += 1
+                cost['seconds'] += elapsed
+        return wrapper
+    return decorator
+
+@st.cache_resource
+def start_warm_up():
+    """
+    Import the heavy dependencies on a background thread, once per server process,
+    so the first roast doesn't pay for them
+    """
+    def warm_up():
+        with time_stage('warm_up'):
+            for module_name in WARM_UP_MODULES:
+                try:
+                    lazy_import(module_name)
+                except ImportError:
+                    pass
+    
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def start_metrics_exporter():
+    """Serve /metrics on METRICS_HOST:METRICS_PORT once per process"""
+    return metrics.start_metrics_server(metrics.REGISTRY, host=METRICS_HOST, port=METRICS_PORT)
+
+# ======================
+# Table Repositories
+# ======================
+
+class TableRepository:
+    """
+    Thin wrapper around one Supabase table. Every method is a single round trip
+    and returns the affected rows, so callers never need a follow-up SELECT.
+    The client comes from client_factory the first time the table is used,
+    so pages that never touch Supabase never create it.
+    """
+
+    def __init__(self, client_factory, table_name: str):
+        self.client_factory = client_factory
+        self.table_name = table_name
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def find(self, columns: str = '*', order_by: str = None, descending: bool = False,
+             limit: int = None, **filters) -> list:
+        """
+        SELECT columns WHERE each filter column equals its value,
+        optionally ORDER BY order_by and LIMIT limit
+        """
+        query = self.client.table(self.table_name).select(columns)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        if order_by:
+            query = query.order(order_by, desc=descending)
+        if limit:
+            query = query.limit(limit)
+        with metrics.REGISTRY.span(SUPABASE_METRIC, table=self.table_name, operation='select'):
+            return query.execute().data or []
+
+    def insert(self, rows) -> list:
+        """
+        INSERT one row (dict) or many rows (list) in a single request
+        """
+        with metrics.REGISTRY.span(SUPABASE_METRIC, table=self.table_name, operation='insert'):
+            return self.client.table(self.table_name).insert(rows).execute().data or []
+
+    def upsert(self, rows, on_conflict: str, ignore_duplicates: bool = False) -> list:
+        """
+        Atomic INSERT ... ON CONFLICT (on_conflict) DO UPDATE (DO NOTHING with
+        ignore_duplicates) for one row (dict) or many rows (list), returning the stored rows
+        """
+        with metrics.REGISTRY.span(SUPABASE_METRIC, table=self.table_name, operation='upsert'):
+            return self.client.table(self.table_name).upsert(
+                rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates
+            ).execute().data or []
+
+    def with_client(self, client) -> 'TableRepository':
+        """
+        The same table through another client (e.g. one acting as a signed-in user)
+        """
+        return TableRepository(lambda: client, self.table_name)
+
+def call_database_function(function_name: str, params: dict, client=None) -> list:
+    """
+    Call a Postgres function through Supabase RPC (on client, default the shared one) and return its rows
+    """
+    with metrics.REGISTRY.span(SUPABASE_METRIC, table=function_name, operation='rpc'):
+        return (client or get_supabase()).rpc(function_name, params).execute().data or []
+
+processing_logs_repo = TableRepository(get_supabase, 'processing_logs')
+user_preferences_repo = TableRepository(get_supabase, 'user_preferences')
+
 # ======================
 # Supabase AI Data Functions
 # ======================
 
+class ProcessingLogWriter:
+    """
+    Background writer that batches processing_logs inserts off the request thread.
+    Batches are flushed by size or interval; if Supabase is unreachable they are
+    appended to a local spool file, which is replayed when the writer starts, after
+    every successful insert and on idle flush ticks. Each event carries a
+    client-generated event_id and inserts skip ids already stored, so a retried
+    batch never logs an event twice.
+    Rows the database rejects outright (bad values, constraint violations) and
+    unreadable spool lines go to a dead-letter file instead of blocking the spool.
+    """
+
+    def __init__(self, repository: TableRepository, batch_size: int = 20, flush_interval: float = 2.0,
+                 max_queue_size: int = 1000, spool_path: str = None, dead_letter_path: str = None):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.dead_letter_path = dead_letter_path or (spool_path + '.dead' if spool_path else None)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._spool_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self._thread = threading.Thread(target=self._run, name="processing-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, event: dict) -> bool:
+        """
+        Queue an event without blocking; returns False if it had to be dropped
+        """
+        if self._stop.is_set():
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(event)
+            self.enqueued += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the worker and flush whatever is still queued (registered with atexit)
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """
+        Queue depth and delivery counters
+        """
+        return {
+            'queue_depth': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'failed_batches': self.failed_batches,
+            'dead_lettered': self.dead_lettered
+        }
+
+    def _run(self):
+        # Deliver whatever an earlier process left behind, even if no new events arrive
+        self._replay_safely()
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write_safely(batch)
+            elif self.spool_path and (os.path.exists(self.spool_path) or os.path.exists(self.spool_path + '.replay')):
+                self._replay_safely()
+        # Drain on shutdown
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._write_safely(batch)
+
+    def _write_safely(self, batch: list):
+        # One bad batch (or spool file) must never kill the writer thread
+        try:
+            self._write(batch)
+        except Exception:
+            self.failed_batches += 1
+
+    def _replay_safely(self):
+        try:
+            self._replay_spool()
+        except Exception:
+            self.failed_batches += 1
+
+    def _collect_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> list:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        try:
+            self._insert(batch)
+        except Exception:
+            self.failed_batches += 1
+            self._spool(batch)
+            return
+        self._replay_spool()
+
+    @staticmethod
+    def _is_rejected_row_error(error: Exception) -> bool:
+        # Postgres data exceptions (22xxx) and constraint violations (23xxx) fail the same way on every retry
+        code = str(getattr(error, 'code', '') or '')
+        return len(code) == 5 and code[:2] in ('22', '23')
+
+    def _insert(self, rows: list):
+        """
+        Insert rows, skipping event_ids that are already stored; if the database
+        rejects the batch, insert row by row and dead-letter the rejected ones.
+        Raises on transient (e.g. network) errors.
+        """
+        try:
+            self.repository.upsert(rows, on_conflict='event_id', ignore_duplicates=True)
+            self.written += len(rows)
+            return
+        except Exception as e:
+            if not self._is_rejected_row_error(e):
+                raise
+        for row in rows:
+            try:
+                self.repository.upsert(row, on_conflict='event_id', ignore_duplicates=True)
+                self.written += 1
+            except Exception as e:
+                if not self._is_rejected_row_error(e):
+                    raise
+                self._dead_letter([json.dumps(row)], reason=str(e))
+
+    def _dead_letter(self, lines: list, reason: str):
+        self.dead_lettered += len(lines)
+        metrics.REGISTRY.increment('processing_log_dead_lettered_total', len(lines))
+        if not self.dead_letter_path:
+            return
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as dead_letter:
+            for line in lines:
+                dead_letter.write(json.dumps({'line': line, 'reason': reason}) + '\n')
+
+    def _spool(self, batch: list):
+        if not self.spool_path:
+            self.dropped += len(batch)
+            return
+        with self._spool_lock:
+            with open(self.spool_path, 'a', encoding='utf-8') as spool:
+                for event in batch:
+                    spool.write(json.dumps(event) + '\n')
+            self.spooled += len(batch)
+
+    def _replay_spool(self):
+        if not self.spool_path:
+            return
+        with self._spool_lock:
+            # Replay from a side file so a failed replay never rewrites the live spool
+            replay_path = self.spool_path + '.replay'
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spool_path):
+                    return
+                os.replace(self.spool_path, replay_path)
+            events = []
+            unreadable = []
+            with open(replay_path, encoding='utf-8', errors='replace') as spool:
+                for line in spool:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        unreadable.append(line.rstrip('\n'))  # e.g. a half-written last line after a crash
+            if unreadable:
+                self._dead_letter(unreadable, reason='unparseable spool line')
+            sent = 0
+            try:
+                while sent < len(events):
+                    chunk = events[sent:sent + self.batch_size]
+                    self._insert(chunk)
+                    sent += len(chunk)
+                    self.replayed += len(chunk)
+            except Exception:
+                self.failed_batches += 1
+                # Keep only what was not replayed
+                with open(replay_path, 'w', encoding='utf-8') as spool:
+                    for event in events[sent:]:
+                        spool.write(json.dumps(event) + '\n')
+                return
+            os.remove(replay_path)
+
+@st.cache_resource
+def get_processing_log_writer() -> ProcessingLogWriter:
+    """Process-wide background writer for processing_logs"""
+    return ProcessingLogWriter(
+        processing_logs_repo,
+        batch_size=PROCESSING_LOG_BATCH_SIZE,
+        flush_interval=PROCESSING_LOG_FLUSH_INTERVAL,
+        max_queue_size=PROCESSING_LOG_QUEUE_SIZE,
+        spool_path=PROCESSING_LOG_SPOOL_PATH
+    )
+
 def log_processing_event(user_id: str, file_type: str, processing_time: float, roast_length: int, success: bool = True):
     """
-    Log AI processing events for analytics (privacy-friendly)
+    Log AI processing events for analytics (privacy-friendly).
+    The insert happens on the background writer; returns False if the event was dropped.
     """
-    try:
-        result = supabase.table('processing_logs').insert({
+    with time_stage('log_processing_event'):
+        return get_processing_log_writer().enqueue({
+            'event_id': str(uuid.uuid4()),  # Makes retried and replayed inserts idempotent
             'user_id': user_id,
             'file_type': file_type,
             'processing_time_seconds': processing_time,
             'roast_length_chars': roast_length,
             'success': success,
             'processed_at': datetime.utcnow().isoformat()
-        }).execute()
-        return result
-    except Exception as e:
-        st.error(f"Failed to log processing event: {str(e)}")
-        return None
+        })
 
-def get_user_stats(user_id: str):
+class ModelMetricsAggregator:
     """
-    Get user's processing statistics
+    Per-model latency histogram, success count and token totals, aggregated in
+    memory and flushed to ai_model_metrics as deltas through the
+    increment_model_metrics SQL function (an atomic upsert that adds to the row).
+    Roast threads only append to a deque, which is atomic, so recording never
+    takes a lock; the flusher thread folds samples into per-model deltas.
     """
-    try:
-        # Try to get stats with the user_id as provided
-        result = supabase.table('processing_logs').select('*').eq('user_id', user_id).execute()
-        
-        if result.data:
-            return result.data
+
+    def __init__(self, flush_interval: float = 30.0, buckets: tuple = metrics.DEFAULT_BUCKETS):
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self._samples = deque()
+        self._pending = {}  # model_name -> delta not yet written (flusher thread only)
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.folded = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self._thread = threading.Thread(target=self._run, name="model-metrics-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, model_name: str, processing_time: float, success: bool,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        self._samples.append((model_name, processing_time, success, prompt_tokens, completion_tokens))
+
+    def flush(self):
+        """
+        Fold queued samples into deltas and write one increment per model.
+        Deltas that fail to write are kept and merged into the next flush.
+        """
+        with self._flush_lock:
+            self._fold()
+            if not self._pending:
+                return
+            if get_supabase() is None:
+                # Headless run without Supabase: nothing to write to
+                self._pending.clear()
+                return
+            for model_name, delta in list(self._pending.items()):
+                try:
+                    call_database_function('increment_model_metrics', {
+                        'model_name_param': model_name,
+                        'request_count': delta['requests'],
+                        'success_count': delta['successes'],
+                        'processing_time_total': round(delta['processing_time'], 3),
+                        'prompt_tokens_total': delta['prompt_tokens'],
+                        'completion_tokens_total': delta['completion_tokens'],
+                        'latency_bounds': list(self.buckets),
+                        'latency_counts': delta['bucket_counts']
+                    })
+                    del self._pending[model_name]
+                    self.flushes += 1
+                except Exception:
+                    self.failed_flushes += 1
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the flusher and write whatever is left (registered with atexit)
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            'queued_samples': len(self._samples),
+            'pending_models': len(self._pending),
+            'folded': self.folded,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes
+        }
+
+    def _fold(self):
+        # Caller holds self._flush_lock
+        while True:
+            try:
+                model_name, processing_time, success, prompt_tokens, completion_tokens = self._samples.popleft()
+            except IndexError:
+                return
+            delta = self._pending.get(model_name)
+            if delta is None:
+                delta = self._pending[model_name] = {
+                    'requests': 0,
+                    'successes': 0,
+                    'processing_time': 0.0,
+                    'prompt_tokens': 0,
+                    'completion_tokens': 0,
+                    'bucket_counts': [0] * (len(self.buckets) + 1)
+                }
+            delta['requests'] += 1
+            delta['successes'] += 1 if success else 0
+            delta['processing_time'] += processing_time
+            delta['prompt_tokens'] += prompt_tokens
+            delta['completion_tokens'] += completion_tokens
+            delta['bucket_counts'][bisect.bisect_left(self.buckets, processing_time)] += 1
+            metrics.REGISTRY.observe('llm_model_latency_seconds', processing_time, model=model_name)
+            metrics.REGISTRY.increment('llm_model_tokens_total', prompt_tokens, model=model_name, kind='prompt')
+            metrics.REGISTRY.increment('llm_model_tokens_total', completion_tokens, model=model_name, kind='completion')
+            self.folded += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+@st.cache_resource
+def get_model_metrics_aggregator() -> ModelMetricsAggregator:
+    """Process-wide per-model metrics aggregator"""
+    return ModelMetricsAggregator(flush_interval=MODEL_METRICS_FLUSH_INTERVAL)
+
+EMPTY_USER_STATS = {
+    'total_roasts': 0,
+    'successful_roasts': 0,
+    'avg_processing_time': 0.0,
+    'recent_activity': []
+}
+
+class PageDataLoader:
+    """
+    Fetches everything the roast page renders for a user - stats totals, recent
+    activity and preferences - in one get_user_page_data RPC, or in concurrent
+    requests on databases without that function. Requests carry the user's
+    access token, since the functions only answer for auth.uid(). A load for a
+    user that is already in flight (another rerun or tab) waits for that request
+    instead of sending its own.
+    """
+
+    def __init__(self, max_workers: int = 3):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page-data")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.batched_rpc_available = True
+        self.loads = 0
+        self.coalesced = 0
+
+    def load(self, user_id: str, access_token: str = None) -> dict:
+        """
+        Returns {'stats': {...}, 'preferences': {...}}; raises if Supabase can't be reached
+        """
+        with self._lock:
+            future = self._in_flight.get(user_id)
+            owner = future is None
+            if owner:
+                future = self._in_flight[user_id] = Future()
+                self.loads += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            metrics.REGISTRY.increment('page_data_loads_total', result='coalesced')
+            return future.result()
         
-        # If no data found, the user might not have processed any resumes yet
-        return []
+        metrics.REGISTRY.increment('page_data_loads_total', result='fetched')
+        try:
+            future.set_result(self._fetch(user_id, access_token))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(user_id, None)
+        return future.result()
+
+    def _fetch(self, user_id: str, access_token: str = None) -> dict:
+        client = get_user_supabase(access_token) if access_token else get_supabase()
+        if self.batched_rpc_available:
+            try:
+                rows = call_database_function('get_user_page_data', {'target_user_id': user_id}, client=client)
+                row = rows[0] if rows else {}
+                return self._page_data(row, row.get('recent_activity') or [], row.get('preferences') or {})
+            except Exception as e:
+                # PGRST202: function not found - supabase_setup.sql hasn't been re-run yet.
+                # 42501: the database refuses the caller (e.g. no user token), which won't change on retry
+                if getattr(e, 'code', None) in ('PGRST202', '42501'):
+                    self.batched_rpc_available = False
+                metrics.REGISTRY.increment('page_data_fallbacks_total')
         
-    except Exception as e:
-        # Don't show error to user, just return empty list
-        return []
+        totals = self._executor.submit(call_database_function, 'get_user_processing_stats',
+                                       {'target_user_id': user_id}, client)
+        recent = self._executor.submit(processing_logs_repo.with_client(client).find, 'file_type, processed_at',
+                                       order_by='processed_at', descending=True, limit=3, user_id=user_id)
+        preferences = self._executor.submit(user_preferences_repo.with_client(client).find, 'preferences',
+                                            user_id=user_id)
+        totals_rows, preference_rows = totals.result(), preferences.result()
+        return self._page_data(totals_rows[0] if totals_rows else {}, recent.result(),
+                               preference_rows[0]['preferences'] if preference_rows else {})
+
+    @staticmethod
+    def _page_data(totals: dict, recent_activity: list, preferences: dict) -> dict:
+        total_roasts = int(totals.get('total_roasts') or 0)
+        return {
+            'stats': {
+                'total_roasts': total_roasts,
+                'successful_roasts': int(totals.get('successful_roasts') or 0),
+                'avg_processing_time': float(totals.get('avg_processing_time') or 0),
+                'recent_activity': list(recent_activity) if total_roasts else []
+            },
+            'preferences': dict(preferences)
+        }
+
+@st.cache_resource
+def get_page_data_loader() -> PageDataLoader:
+    """Process-wide page data loader (shared so concurrent identical loads coalesce)"""
+    return PageDataLoader()
+
+def load_page_data(user_id: str) -> dict:
+    """
+    Stats and preferences for one page render: from the session caches while
+    they're fresh, otherwise one coalesced PageDataLoader fetch that refills both,
+    so the sidebar and the main panel share a single round trip.
+    Returns {'stats': {...}, 'preferences': {...}}
+    """
+    now = time.monotonic()
+    cached_stats = st.session_state.user_stats_cache.get(user_id)
+    cached_prefs = st.session_state.preferences_cache.get(user_id)
+    stats_fresh = bool(cached_stats) and now - cached_stats[0] < USER_STATS_CACHE_TTL_SECONDS
+    prefs_fresh = bool(cached_prefs) and now - cached_prefs[0] < PREFERENCES_CACHE_TTL_SECONDS
+    metrics.REGISTRY.increment('session_cache_lookups_total', cache='user_stats', result='hit' if stats_fresh else 'miss')
+    metrics.REGISTRY.increment('session_cache_lookups_total', cache='preferences', result='hit' if prefs_fresh else 'miss')
+    
+    if not (stats_fresh and prefs_fresh):
+        try:
+            access_token = (st.session_state.user_session or {}).get('access_token')
+            with time_stage('page_data_fetch'):
+                page_data = get_page_data_loader().load(user_id, access_token)
+        except Exception as e:
+            # Don't show errors to the user; fall back to whatever is cached, else defaults
+            return {
+                'stats': cached_stats[1] if cached_stats else dict(EMPTY_USER_STATS),
+                'preferences': dict(cached_prefs[1]) if cached_prefs else {}
+            }
+        cached_stats = st.session_state.user_stats_cache[user_id] = (now, page_data['stats'])
+        # Keep fresh cached preferences: they may come from a save newer than this fetch
+        if not prefs_fresh:
+            _cache_user_preferences(user_id, page_data['preferences'])
+            cached_prefs = st.session_state.preferences_cache[user_id]
+    
+    return {'stats': cached_stats[1], 'preferences': dict(cached_prefs[1])}
+
+def get_user_stats(user_id: str) -> dict:
+    """
+    Get user's processing statistics (totals, success rate, 3 most recent events)
+    """
+    return load_page_data(user_id)['stats']
 
 def store_user_preferences(user_id: str, preferences: dict):
     """
@@ -101,62 +836,438 @@ def store_user_preferences(user_id: str, preferences: dict):
             st.error(f"Invalid user ID format: {user_id}")
             return None
         
-        # First, check if record exists
-        existing_result = supabase.table('user_preferences').select('*').eq('user_id', user_id_clean).execute()
-        
-        if existing_result.data:
-            # Update existing record
-            result = supabase.table('user_preferences').update({
-                'preferences': preferences,
-                'updated_at': datetime.utcnow().isoformat()
-            }).eq('user_id', user_id_clean).execute()
-        else:
-            # Insert new record
-            result = supabase.table('user_preferences').insert({
+        # Single atomic upsert on UNIQUE(user_id); the response carries the stored row
+        with time_stage('preferences_store'):
+            stored_rows = user_preferences_repo.upsert({
                 'user_id': user_id_clean,
                 'preferences': preferences,
                 'updated_at': datetime.utcnow().isoformat()
-            }).execute()
+            }, on_conflict='user_id')
         
-        # Verify the data was actually stored
-        verification_result = supabase.table('user_preferences').select('*').eq('user_id', user_id_clean).execute()
+        # Verify the write from the returned row instead of re-reading it
+        if stored_rows and stored_rows[0].get('preferences') == preferences:
+            stored_row = stored_rows[0]
+            _cache_user_preferences(user_id, stored_row['preferences'])
+            return stored_row
         
-        if verification_result.data:
-            stored_prefs = verification_result.data[0]['preferences']
-            # Check if the preferences match what we tried to store
-            if stored_prefs == preferences:
-                return result
-            else:
-                return None
-        else:
-            return None
+        invalidate_user_preferences(user_id)
+        return None
         
     except Exception as e:
+        invalidate_user_preferences(user_id)
         st.error(f"Failed to store preferences: {str(e)}")
         return None
 
+def _cache_user_preferences(user_id: str, preferences: dict):
+    """
+    Remember preferences for this session (write-through target for store_user_preferences)
+    """
+    st.session_state.preferences_cache[user_id] = (time.monotonic(), dict(preferences))
+
+def invalidate_user_preferences(user_id: str):
+    """
+    Drop cached preferences so the next read goes to Supabase
+    """
+    st.session_state.preferences_cache.pop(user_id, None)
+
 def get_user_preferences(user_id: str):
     """
-    Get user preferences
+    Get user preferences (cached per session for PREFERENCES_CACHE_TTL_SECONDS)
+    """
+    return load_page_data(user_id)['preferences']
+
+# ======================
+# PDF Extraction
+# ======================
+
+@st.cache_resource
+def get_pdf_process_pool() -> ProcessPoolExecutor:
+    """Process pool for extracting PDFs (spawned, since the server is multithreaded)"""
+    return ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+_pdf_pool_lock = threading.Lock()
+
+def retire_pdf_process_pool(pool: ProcessPoolExecutor):
+    """
+    Replace a pool with a worker stuck on a pathological PDF. New extractions get
+    a fresh pool; other sessions' extractions keep running on the old one, which
+    is killed once they have all passed their own timeout.
+    """
+    with _pdf_pool_lock:
+        if get_pdf_process_pool() is pool:
+            get_pdf_process_pool.clear()
+    reaper = threading.Timer(PDF_EXTRACTION_TIMEOUT_SECONDS, pdf_extractor.terminate_executor, args=(pool,))
+    reaper.daemon = True
+    reaper.start()
+
+class PartialExtraction(Exception):
+    """
+    Extraction timed out; carries the partial result past st.cache_data, which doesn't cache exceptions
     """
+
+    def __init__(self, text: str, extraction_stats: dict):
+        super().__init__("PDF extraction timed out")
+        self.text = text
+        self.extraction_stats = extraction_stats
+
+@st.cache_data(max_entries=64, ttl=3600, show_spinner=False)
+def _extract_pdf_text_cached(content_hash: str, _file_bytes: bytes, max_chars: int) -> tuple[str, dict]:
+    # Keyed on content_hash and max_chars; Streamlit skips hashing underscore-prefixed arguments
+    pool = get_pdf_process_pool()
+    text, extraction_stats = pdf_extractor.extract_pdf_text(
+        _file_bytes,
+        executor=pool,
+        max_pages=PDF_MAX_PAGES,
+        timeout=PDF_EXTRACTION_TIMEOUT_SECONDS,
+        parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+        max_chars=max_chars
+    )
+    if extraction_stats['timed_out']:
+        # Don't leave workers pinned on a pathological document, and don't cache the partial text
+        retire_pdf_process_pool(pool)
+        raise PartialExtraction(text, extraction_stats)
+    return text, extraction_stats
+
+def _extract_pdf_text(content_hash: str, file_bytes: bytes, max_chars: int) -> tuple[str, dict]:
     try:
-        result = supabase.table('user_preferences').select('preferences').eq('user_id', user_id).execute()
-        if result.data:
-            return result.data[0]['preferences']
-        return {}
-    except Exception as e:
-        return {}
+        return _extract_pdf_text_cached(content_hash, file_bytes, max_chars)
+    except PartialExtraction as partial:
+        return partial.text, partial.extraction_stats
+
+def extract_resume_pdf_text(file_bytes: bytes) -> tuple[str, dict]:
+    """
+    Extract resume text from PDF bytes (up to INGEST_MAX_CHARS) in the PDF process
+    pool, memoized by content hash so reruns don't re-parse (timed-out extractions
+    aren't memoized). Raises ingestion.UploadTooLargeError past UPLOAD_MAX_BYTES.
+    Returns tuple of (resume_text, extraction_stats)
+    """
+    with time_stage('pdf_extraction'):
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        return ingestion.ingest_pdf(
+            file_bytes, UPLOAD_MAX_BYTES, INGEST_MAX_CHARS,
+            extract=lambda pdf_bytes, max_chars: _extract_pdf_text(content_hash, pdf_bytes, max_chars)
+        )
+
+def ingest_resume_text(uploaded_file) -> tuple[str, dict]:
+    """
+    Stream a TXT upload through bounded, encoding-detecting ingestion.
+    Raises ingestion.UploadTooLargeError past UPLOAD_MAX_BYTES.
+    Returns tuple of (resume_text, ingest_stats)
+    """
+    with time_stage('txt_ingestion'):
+        uploaded_file.seek(0)
+        return ingestion.ingest_text(uploaded_file, UPLOAD_MAX_BYTES, INGEST_MAX_CHARS)
+
+# ======================
+# Prompt Compaction
+# ======================
+
+# Resume section headings, highest roasting value first
+SECTION_PRIORITIES = {
+    'summary': 0, 'profile': 0, 'objective': 0,
+    'experience': 1, 'work experience': 1, 'employment': 1, 'professional experience': 1,
+    'skills': 2, 'technical skills': 2, 'projects': 2,
+    'education': 3, 'certifications': 4, 'awards': 4, 'achievements': 4,
+    'publications': 5, 'volunteer': 5, 'languages': 5,
+    'interests': 6, 'hobbies': 6, 'references': 7
+}
+HEADER_PRIORITY = 1  # Name/contact block before the first heading
+
+_SECTION_HEADING_PATTERN = re.compile(
+    r'(?:^|\n)[ \t]*(' + '|'.join(sorted(SECTION_PRIORITIES, key=len, reverse=True)) + r')[ \t]*:?[ \t]*(?=\n)'
+    # Inline headings (PDF text often loses the line breaks) only count in capitals
+    r'|(?-i:\b(' + '|'.join(heading.upper() for heading in sorted(SECTION_PRIORITIES, key=len, reverse=True)) + r')\b)',
+    re.IGNORECASE
+)
+_BOILERPLATE_PATTERN = re.compile(
+    r'references (?:are )?available (?:up)?on request|page \d+ (?:of|/) \d+|^curriculum vitae$|^r[eé]sum[eé]$',
+    re.IGNORECASE
+)
+# Short lines that are page furniture when they repeat: page numbers, links, e-mail addresses
+_PAGE_CHROME_PATTERN = re.compile(
+    r'^(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?$|https?://|www\.|[\w.+-]+@[\w-]+\.\w',
+    re.IGNORECASE
+)
+_PAGE_CHROME_MAX_CHARS = 80
+
+# Whole-line section headings for the pre-analysis section statistics
+_SECTION_LINE_PATTERN = re.compile('|'.join(sorted(SECTION_PRIORITIES, key=len, reverse=True)), re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1)
+def _get_token_encoder():
+    # tiktoken is optional and may need to download its encoding on first use
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(ROAST_MODEL)
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """
+    Count model tokens with tiktoken, or estimate ~4 chars per token if it's unavailable
+    """
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text down to at most max_tokens tokens
+    """
+    if max_tokens <= 0:
+        return ''
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    tokens = encoder.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoder.decode(tokens[:max_tokens])
+
+def _strip_boilerplate(resume_text: str) -> str:
+    # Collapse whitespace and drop lines that carry no roastable content:
+    # page footers, stock phrases, and repeats of short page-furniture lines
+    # (page numbers, contact links). Other repeated lines are real content,
+    # e.g. the same job title or bullet under two jobs, and are kept.
+    seen = set()
+    kept = []
+    for line in resume_text.splitlines():
+        line = ' '.join(line.split())
+        repeated_chrome = (line in seen and len(line) <= _PAGE_CHROME_MAX_CHARS
+                           and _PAGE_CHROME_PATTERN.search(line))
+        if repeated_chrome or _BOILERPLATE_PATTERN.search(line) or not re.search(r'\w', line):
+            if kept and kept[-1] != '':
+                kept.append('')
+            continue
+        seen.add(line)
+        kept.append(line)
+    return '\n'.join(kept).strip()
+
+def _split_sections(resume_text: str) -> list:
+    # Returns [(priority, text)] in document order
+    sections = []
+    last_start, last_priority = 0, HEADER_PRIORITY
+    for match in _SECTION_HEADING_PATTERN.finditer(resume_text):
+        heading = (match.group(1) or match.group(2)).lower()
+        start = match.start(1) if match.group(1) else match.start(2)
+        if start > last_start:
+            sections.append((last_priority, resume_text[last_start:start]))
+        last_start, last_priority = start, SECTION_PRIORITIES[heading]
+    sections.append((last_priority, resume_text[last_start:]))
+    return [(priority, text.strip()) for priority, text in sections if text.strip()]
+
+def analyze_resume_text(resume_text: str) -> dict:
+    """
+    Local cliché/buzzword and length analysis of a resume (milliseconds, no network)
+    """
+    with time_stage('pre_analysis'):
+        return resume_analyzer.analyze_resume(resume_text, section_pattern=_SECTION_LINE_PATTERN)
+
+def compact_resume_text(resume_text: str, token_budget: int = ROAST_INPUT_TOKEN_BUDGET) -> tuple[str, dict]:
+    """
+    Fit resume text into token_budget: strip boilerplate, then keep the
+    highest-value sections (truncating the last one that partly fits).
+    Returns tuple of (compacted_text, compaction_stats)
+    """
+    original_tokens = count_tokens(resume_text)
+    compacted = _strip_boilerplate(resume_text)
+    compacted_tokens = count_tokens(compacted)
+    truncated = False
+    
+    if compacted_tokens > token_budget:
+        truncated = True
+        sections = _split_sections(compacted)
+        selected = {}
+        remaining = token_budget
+        for index in sorted(range(len(sections)), key=lambda i: sections[i][0]):
+            if remaining <= 0:
+                break
+            section_text = sections[index][1]
+            section_tokens = count_tokens(section_text)
+            if section_tokens > remaining:
+                section_text = truncate_to_tokens(section_text, remaining)
+                section_tokens = count_tokens(section_text)
+            selected[index] = section_text
+            remaining -= section_tokens + 1  # +1 for the joining blank line
+        compacted = '\n\n'.join(selected[index] for index in sorted(selected))
+        compacted_tokens = count_tokens(compacted)
+    
+    compaction_stats = {
+        'original_tokens': original_tokens,
+        'sent_tokens': compacted_tokens,
+        'truncated': truncated,
+        'exact_token_count': _get_token_encoder() is not None
+    }
+    return compacted, compaction_stats
+
+# ======================
+# Roast Cache
+# ======================
+
+class RoastCache:
+    """
+    Two-tier cache for roast results: a bounded in-process LRU backed by an
+    optional SQLite file with TTL eviction. Only roast output is stored, never resume text.
+    """
+
+    def __init__(self, max_entries: int = 256, db_path: str = None, ttl_seconds: int = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            # WAL + busy timeout: several processes (e.g. roast_api.py workers) can share the file
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS roast_cache ("
+                "cache_key TEXT PRIMARY KEY, roast TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str):
+        """
+        Return the cached roast for key, or None on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT roast, created_at FROM roast_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                if row and time.time() - row[1] <= self.ttl_seconds:
+                    self._remember(key, row[0])
+                    self.disk_hits += 1
+                    return row[0]
+                if row:
+                    self._db.execute("DELETE FROM roast_cache WHERE cache_key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def contains(self, key: str) -> bool:
+        """
+        Whether a live roast is cached for key, without touching the hit/miss
+        counters or the LRU order (for probes ahead of the real lookup)
+        """
+        with self._lock:
+            if key in self._entries:
+                return True
+            if self._db is None:
+                return False
+            row = self._db.execute("SELECT created_at FROM roast_cache WHERE cache_key = ?", (key,)).fetchone()
+            return bool(row) and time.time() - row[0] <= self.ttl_seconds
+
+    def set(self, key: str, roast: str):
+        """
+        Store a roast in both tiers
+        """
+        with self._lock:
+            self._remember(key, roast)
+            if self._db is not None:
+                now = time.time()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO roast_cache (cache_key, roast, created_at) VALUES (?, ?, ?)",
+                    (key, roast, now)
+                )
+                self._db.execute("DELETE FROM roast_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters for display and monitoring
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries)
+            }
+
+    def _remember(self, key: str, roast: str):
+        # Caller must hold the lock
+        self._entries[key] = roast
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_roast_cache() -> RoastCache:
+    """Process-wide roast cache shared across sessions"""
+    return RoastCache(
+        max_entries=ROAST_CACHE_MAX_ENTRIES,
+        db_path=ROAST_CACHE_DB_PATH,
+        ttl_seconds=ROAST_CACHE_TTL_SECONDS
+    )
+
+def roast_cache_key(resume_text: str, roast_style: str, humor_level: str,
+                    model: str = ROAST_MODEL, prompt_version: str = ROAST_PROMPT_VERSION) -> str:
+    """
+    Content-addressed cache key: whitespace-normalized resume text plus every
+    input that changes the generated roast
+    """
+    normalized_text = ' '.join(resume_text.split())
+    payload = json.dumps([normalized_text, roast_style, humor_level, model, prompt_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 # ======================
 # Enhanced AI Processing Function
 # ======================
 
-def roast_resume(resume_text: str, user_id: str = None, preferences: dict = None) -> tuple[str, dict]:
+@st.cache_resource
+def get_llm_backend() -> LLMBackend:
+    """Process-wide LLM backend selected by LLM_BACKEND"""
+    if LLM_BACKEND == 'fake':
+        return create_backend(
+            'fake',
+            first_token_ms=FAKE_LLM_FIRST_TOKEN_MS,
+            latency_distribution=FAKE_LLM_LATENCY_DISTRIBUTION,
+            tokens_per_second=FAKE_LLM_TOKENS_PER_SECOND,
+            error_rate=FAKE_LLM_ERROR_RATE
+        )
+    return create_backend(LLM_BACKEND, model=ROAST_MODEL, api_key=OPENAI_API_KEY)
+
+@st.cache_resource
+def get_llm_guard() -> LLMGuard:
+    """Process-wide admission controller, retry policy and circuit breaker for LLM calls"""
+    return LLMGuard(
+        AdmissionController(
+            max_in_flight=LLM_MAX_IN_FLIGHT,
+            max_waiting=LLM_MAX_WAITING,
+            wait_timeout=LLM_QUEUE_TIMEOUT_SECONDS
+        ),
+        CircuitBreaker(
+            failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=LLM_BREAKER_RESET_SECONDS
+        ),
+        max_retries=LLM_MAX_RETRIES,
+        backoff_base=LLM_BACKOFF_BASE_SECONDS,
+        backoff_max=LLM_BACKOFF_MAX_SECONDS
+    )
+
+def roast_resume(resume_text: str, user_id: str = None, preferences: dict = None,
+                 on_token=None, backend: LLMBackend = None) -> tuple[str, dict]:
     """
-    Process resume text through OpenAI for a humorous critique.
+    Process resume text through the LLM backend (OpenAI by default) for a humorous critique.
+    If on_token is given, the completion is streamed and on_token is called with
+    the text received so far after every chunk.
     Returns tuple of (roast_result, processing_stats)
     """
-    start_time = datetime.now()
+    start_time = time.perf_counter()
+    backend = backend or get_llm_backend()
     
     # Get user preferences or defaults
     if not preferences:
@@ -164,6 +1275,45 @@ def roast_resume(resume_text: str, user_id: str = None, preferences: dict = None
     
     roast_style = preferences.get('roast_style', 'balanced')
     humor_level = preferences.get('humor_level', 'medium')
+    file_type = 'pdf' if resume_text.startswith('%PDF') else 'txt'
+    
+    # Serve repeat roasts of the same resume/settings from the cache
+    roast_cache = get_roast_cache()
+    cache_key = roast_cache_key(resume_text, roast_style, humor_level, model=backend.model_name)
+    cached_roast = roast_cache.get(cache_key)
+    metrics.REGISTRY.increment('roast_cache_lookups_total', result='hit' if cached_roast is not None else 'miss')
+    if cached_roast is not None:
+        processing_time = time.perf_counter() - start_time
+        metrics.REGISTRY.observe(STAGE_METRIC, processing_time, stage='roast_total')
+        processing_stats = {
+            'processing_time': processing_time,
+            'roast_length': len(cached_roast),
+            'success': True,
+            'model_used': backend.model_name,
+            'roast_style': roast_style,
+            'humor_level': humor_level,
+            'cache_hit': True,
+            'streamed': False,
+            'time_to_first_token': processing_time
+        }
+        
+        if user_id:
+            log_processing_event(
+                user_id=user_id,
+                file_type=file_type,
+                processing_time=processing_time,
+                roast_length=len(cached_roast),
+                success=True
+            )
+        
+        return cached_roast, processing_stats
+    
+    # Keep the prompt inside the token budget
+    with time_stage('prompt_compaction'):
+        resume_text_for_prompt, compaction_stats = compact_resume_text(resume_text)
+    prescan_findings = ''
+    if ROAST_PREANALYSIS_IN_PROMPT:
+        prescan_findings = f"\n            {resume_analyzer.format_for_prompt(analyze_resume_text(resume_text))}\n"
     
     # Customize prompt based on preferences - BRUTAL EDITION
     style_prompts = {
@@ -191,40 +1341,76 @@ def roast_resume(resume_text: str, user_id: str = None, preferences: dict = None
             Be merciless about generic phrases, obvious lies, and pathetic attempts at sounding professional.
             
             Keep it under 150 words but make every word count like a surgical strike.
-            
+            {prescan_findings}
             Resume to destroy:
-            {resume_text}"""
+            {resume_text_for_prompt}"""
     
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a savage comedy roast master who destroys resumes with brutal honesty and cutting humor. You have the wit of Pete Davidson, the ruthlessness of Gordon Ramsay, and the sharp tongue of The Simpsons. Show no mercy. Be technically brutal about every aspect of the resume while maintaining comedic value. Your goal is to make them laugh while simultaneously destroying their confidence."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=350,
-            temperature=0.9
-        )
-        roast_result = response.choices[0].message.content if response.choices else "No response from AI."
+        messages = [
+            {"role": "system", "content": "You are a savage comedy roast master who destroys resumes with brutal honesty and cutting humor. You have the wit of Pete Davidson, the ruthlessness of Gordon Ramsay, and the sharp tongue of The Simpsons. Show no mercy. Be technically brutal about every aspect of the resume while maintaining comedic value. Your goal is to make them laugh while simultaneously destroying their confidence."},
+            {"role": "user", "content": prompt}
+        ]
+        
+        time_to_first_token = None
+        chunks = []
+        
+        def request_completion():
+            nonlocal time_to_first_token
+            if on_token is None:
+                return backend.complete(messages, max_tokens=350, temperature=0.9)
+            # Render tokens as they arrive, but still build the full string for caching and logging
+            for content in backend.stream(messages, max_tokens=350, temperature=0.9):
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                    metrics.REGISTRY.observe('llm_time_to_first_token_seconds', time_to_first_token)
+                chunks.append(content)
+                on_token(''.join(chunks))
+            return ''.join(chunks)
+        
+        # Admission control, retries and circuit breaking are shared by every session;
+        # a stream is only retried if nothing has been shown yet
+        with time_stage('llm_completion'):
+            roast_result, call_stats = get_llm_guard().call(request_completion, can_retry=lambda: not chunks)
+        metrics.REGISTRY.observe('llm_queue_wait_seconds', call_stats['queue_wait'])
+        if call_stats['attempts'] > 1:
+            metrics.REGISTRY.increment('llm_retries_total', call_stats['attempts'] - 1)
+        
+        if roast_result:
+            roast_cache.set(cache_key, roast_result)
+        else:
+            roast_result = "No response from AI."
         
         # Calculate processing stats
-        end_time = datetime.now()
-        processing_time = (end_time - start_time).total_seconds()
+        processing_time = time.perf_counter() - start_time
+        metrics.REGISTRY.observe(STAGE_METRIC, processing_time, stage='roast_total')
+        metrics.REGISTRY.increment('roasts_total', outcome='success')
+        prompt_tokens = sum(count_tokens(message['content']) for message in messages)
+        completion_tokens = count_tokens(roast_result)
+        get_model_metrics_aggregator().record(backend.model_name, processing_time, True, prompt_tokens, completion_tokens)
         
         processing_stats = {
             'processing_time': processing_time,
             'roast_length': len(roast_result),
             'success': True,
-            'model_used': 'gpt-3.5-turbo',
+            'model_used': backend.model_name,
             'roast_style': roast_style,
-            'humor_level': humor_level
+            'humor_level': humor_level,
+            'cache_hit': False,
+            'streamed': on_token is not None,
+            'time_to_first_token': time_to_first_token if time_to_first_token is not None else processing_time,
+            'original_tokens': compaction_stats['original_tokens'],
+            'sent_tokens': compaction_stats['sent_tokens'],
+            'queue_wait_time': call_stats['queue_wait'],
+            'llm_attempts': call_stats['attempts'],
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens
         }
         
         # Log the event if user is authenticated
         if user_id:
             log_processing_event(
                 user_id=user_id,
-                file_type='pdf' if resume_text.startswith('%PDF') else 'txt',
+                file_type=file_type,
                 processing_time=processing_time,
                 roast_length=len(roast_result),
                 success=True
@@ -233,11 +1419,20 @@ def roast_resume(resume_text: str, user_id: str = None, preferences: dict = None
         return roast_result, processing_stats
         
     except Exception as e:
+        metrics.REGISTRY.increment('roasts_total', outcome=type(e).__name__)
+        if not isinstance(e, (CircuitOpenError, AdmissionTimeoutError)):
+            # Only requests that actually reached the model count against it
+            get_model_metrics_aggregator().record(backend.model_name, time.perf_counter() - start_time, False)
         processing_stats = {
             'processing_time': 0,
             'roast_length': 0,
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'error_type': type(e).__name__,
+            'retryable': is_retryable_error(e),
+            'retry_after': retry_after_seconds(e),
+            'queue_wait_time': getattr(e, 'call_stats', {}).get('queue_wait', 0.0),
+            'llm_attempts': getattr(e, 'call_stats', {}).get('attempts', 0)
         }
         
         if user_id:
@@ -251,6 +1446,209 @@ def roast_resume(resume_text: str, user_id: str = None, preferences: dict = None
         
         return f"Error processing resume: {str(e)}", processing_stats
 
+# ======================
+# Roast Job Queue
+# ======================
+
+class RoastJob:
+    """
+    One roast submitted to the job queue; the worker fills in partial_text while
+    streaming, then result and processing_stats
+    """
+
+    def __init__(self, job_id: str, user_id: str, resume_digest: str, dedupe_key: str, preferences: dict):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.resume_digest = resume_digest
+        self.dedupe_key = dedupe_key
+        self.preferences = preferences
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.partial_text = ''
+        self.variants = {}  # 'style/humor' -> pending | ready | skipped | failed (speculative roasts)
+        self.result = None
+        self.processing_stats = None
+        self.submitted_at = time.monotonic()
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+ROAST_STYLES = ["gentle", "balanced", "savage"]
+HUMOR_LEVELS = ["low", "medium", "high"]
+
+def likely_variants(roast_style: str, humor_level: str, limit: int) -> list:
+    """
+    (style, humor) combinations a user is most likely to try next, best guess first:
+    the style the result page suggests (gentle <-> savage), the other styles, then humor levels
+    """
+    suggested_style = {'gentle': 'savage', 'savage': 'gentle'}.get(roast_style)
+    candidates = [(suggested_style, humor_level)] if suggested_style else []
+    candidates += [(style, humor_level) for style in ROAST_STYLES]
+    candidates += [(roast_style, humor) for humor in HUMOR_LEVELS]
+    variants = []
+    for candidate in candidates:
+        if candidate != (roast_style, humor_level) and candidate not in variants:
+            variants.append(candidate)
+    return variants[:limit]
+
+class RoastJobQueue:
+    """
+    Runs roast_resume on a worker pool so a slow LLM call never holds the
+    Streamlit script thread. Jobs are looked up by ID; resubmitting the same
+    resume/settings while a job is running (or recently done) returns that job
+    instead of calling the LLM again.
+    With speculative_variants > 0, each finished roast also queues the most likely
+    other style/humor variants on a separate low-priority pool; they land in the
+    roast cache, so picking one of them later is answered without an LLM call.
+    """
+
+    def __init__(self, max_workers: int = 8, retention_seconds: float = 900.0,
+                 speculative_variants: int = 0, speculative_workers: int = 2):
+        self.retention_seconds = retention_seconds
+        self.speculative_variants = speculative_variants
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="roast-job")
+        self._speculation_executor = ThreadPoolExecutor(max_workers=max(1, speculative_workers),
+                                                        thread_name_prefix="roast-speculation")
+        self._jobs = {}
+        self._jobs_by_key = {}
+        self._speculated = {}  # roast cache key -> time generated, until consumed or expired
+        self._lock = threading.Lock()
+        self.variants_generated = 0
+        self.variants_consumed = 0
+
+    def submit(self, resume_text: str, user_id: str, preferences: dict, stream: bool = True) -> RoastJob:
+        import uuid
+        # Resolve defaults here: workers have no session_state to look preferences up in
+        preferences = {
+            'roast_style': preferences.get('roast_style', 'balanced'),
+            'humor_level': preferences.get('humor_level', 'medium')
+        }
+        resume_digest = hashlib.sha256(resume_text.encode('utf-8')).hexdigest()
+        cache_key = roast_cache_key(
+            resume_text, preferences['roast_style'], preferences['humor_level'],
+            model=get_llm_backend().model_name
+        )
+        dedupe_key = f"{user_id}:{cache_key}"
+        with self._lock:
+            self._prune()
+            existing = self._jobs.get(self._jobs_by_key.get(dedupe_key))
+            if existing is not None and existing.status != 'failed':
+                metrics.REGISTRY.increment('roast_jobs_deduplicated_total')
+                return existing
+            job = RoastJob(uuid.uuid4().hex, user_id, resume_digest, dedupe_key, preferences)
+            self._jobs[job.job_id] = job
+            self._jobs_by_key[dedupe_key] = job.job_id
+            if self._speculated.pop(cache_key, None) is not None:
+                self.variants_consumed += 1
+                metrics.REGISTRY.increment('roast_variants_consumed_total')
+        if get_roast_cache().contains(cache_key):
+            # Cached (e.g. a speculative variant): finish now instead of waiting for a poll
+            self._run(job, resume_text, stream=False)
+        else:
+            self._executor.submit(self._run, job, resume_text, stream)
+        return job
+
+    def _run(self, job: RoastJob, resume_text: str, stream: bool):
+        metrics.REGISTRY.observe('roast_job_queue_seconds', time.monotonic() - job.submitted_at)
+        job.status = 'running'
+        try:
+            job.result, job.processing_stats = roast_resume(
+                resume_text,
+                user_id=job.user_id,
+                preferences=job.preferences,
+                on_token=(lambda partial: setattr(job, 'partial_text', partial)) if stream else None
+            )
+            job.status = 'done' if job.processing_stats.get('success') else 'failed'
+        except Exception as e:
+            job.result = f"Error processing resume: {str(e)}"
+            job.processing_stats = {'success': False, 'error': str(e), 'error_type': type(e).__name__}
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.monotonic()
+            metrics.REGISTRY.increment('roast_jobs_total', status=job.status)
+        if self.speculative_variants and job.status == 'done':
+            self._speculate(job, resume_text)
+
+    def _speculate(self, job: RoastJob, resume_text: str):
+        model_name = get_llm_backend().model_name
+        roast_cache = get_roast_cache()
+        for roast_style, humor_level in likely_variants(job.preferences['roast_style'], job.preferences['humor_level'],
+                                                        self.speculative_variants):
+            variant = f"{roast_style}/{humor_level}"
+            if roast_cache.contains(roast_cache_key(resume_text, roast_style, humor_level, model=model_name)):
+                job.variants[variant] = 'ready'
+                continue
+            job.variants[variant] = 'pending'
+            self._speculation_executor.submit(self._generate_variant, job, variant, resume_text,
+                                              {'roast_style': roast_style, 'humor_level': humor_level})
+
+    def _generate_variant(self, job: RoastJob, variant: str, resume_text: str, preferences: dict):
+        # Never compete with real roasts for LLM slots: skip when the guard is half busy
+        admission = get_llm_guard().admission
+        if admission.stats()['in_flight'] >= max(1, admission.max_in_flight // 2):
+            job.variants[variant] = 'skipped'
+            metrics.REGISTRY.increment('roast_variants_skipped_total', reason='busy')
+            return
+        # No user_id: a speculative roast is not a user action, so it isn't logged as one
+        _, processing_stats = roast_resume(resume_text, preferences=preferences)
+        if not processing_stats.get('success'):
+            job.variants[variant] = 'failed'
+            metrics.REGISTRY.increment('roast_variants_skipped_total', reason='failed')
+            return
+        job.variants[variant] = 'ready'
+        cache_key = roast_cache_key(resume_text, preferences['roast_style'], preferences['humor_level'],
+                                    model=processing_stats['model_used'])
+        with self._lock:
+            self._speculated[cache_key] = time.monotonic()
+            self.variants_generated += 1
+        metrics.REGISTRY.increment('roast_variants_generated_total')
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest_for_user(self, user_id: str, resume_digest: str = None):
+        """
+        Most recent job for a user (optionally for one resume), e.g. after a reconnect
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values()
+                    if job.user_id == user_id and resume_digest in (None, job.resume_digest)]
+        return max(jobs, key=lambda job: job.submitted_at, default=None)
+
+    def _prune(self):
+        # Caller holds self._lock
+        cutoff = time.monotonic() - self.retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._jobs_by_key.get(job.dedupe_key) == job_id:
+                    del self._jobs_by_key[job.dedupe_key]
+        for cache_key, generated_at in list(self._speculated.items()):
+            if generated_at < cutoff:
+                del self._speculated[cache_key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            job_stats = {status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed')}
+            job_stats['variants_generated'] = self.variants_generated
+            job_stats['variants_consumed'] = self.variants_consumed
+        return job_stats
+
+@st.cache_resource
+def get_roast_job_queue() -> RoastJobQueue:
+    """
+    Process-wide roast job queue shared by every session
+    """
+    return RoastJobQueue(
+        max_workers=ROAST_JOB_WORKERS,
+        retention_seconds=ROAST_JOB_RETENTION_SECONDS,
+        speculative_variants=ROAST_SPECULATIVE_VARIANTS,
+        speculative_workers=ROAST_SPECULATIVE_WORKERS
+    )
+
 # ======================
 # Page Functions
 # ======================
@@ -335,9 +1733,10 @@ def show_auth_page():
     st.markdown("---")
     
     # Supabase Authentication
-    session = login_form(
-        url=SUPABASE_URL,
-        apiKey=SUPABASE_KEY
+    supabase_url, supabase_key = get_supabase_credentials()
+    session = lazy_import('streamlit_supabase_auth').login_form(
+        url=supabase_url,
+        apiKey=supabase_key
     )
     
     if not session:
@@ -361,6 +1760,7 @@ def show_auth_page():
     st.session_state.page = "roast"
     st.rerun()
 
+@track_rerun_cost('page')
 def show_roast_page():
     """
     Main resume roasting application with AI data processing
@@ -370,9 +1770,10 @@ def show_roast_page():
     
     if not user_session:
         # Try to get fresh session
-        session = login_form(
-            url=SUPABASE_URL,
-            apiKey=SUPABASE_KEY
+        supabase_url, supabase_key = get_supabase_credentials()
+        session = lazy_import('streamlit_supabase_auth').login_form(
+            url=supabase_url,
+            apiKey=supabase_key
         )
         
         if not session:
@@ -390,99 +1791,160 @@ def show_roast_page():
     # Header
     st.title("🔥 Resume Roast - AI Edition 🔥")
     
-    # Sidebar with user info, preferences, and stats
+    # Everything this page needs from Supabase, fetched once; the panels below read it
+    # from the session cache, including when they rerun on their own
+    load_page_data(user_id)
+    
+    # Sidebar with user info, preferences, and stats. Each panel is a fragment:
+    # interacting with one reruns only that panel, not the whole page.
     with st.sidebar:
         st.write(f"🎭 Welcome {user_email}!")
         st.markdown("---")
         
-        # User Statistics
-        with st.expander("📊 Your Roast Stats", expanded=False):
-            user_stats = get_user_stats(user_id)
-            if user_stats and len(user_stats) > 0:
-                total_roasts = len(user_stats)
-                successful_roasts = len([s for s in user_stats if s.get('success', True)])
-                avg_processing_time = sum(s.get('processing_time_seconds', 0) for s in user_stats) / len(user_stats)
-                
-                st.metric("Total Roasts", total_roasts)
-                st.metric("Success Rate", f"{(successful_roasts/total_roasts)*100:.1f}%")
-                st.metric("Avg Processing Time", f"{avg_processing_time:.2f}s")
-                
-                # Recent activity
-                st.write("🕒 **Recent Activity:**")
-                for stat in user_stats[-3:]:  # Last 3 roasts
-                    processed_at = stat.get('processed_at', 'Unknown')
-                    if processed_at != 'Unknown':
-                        try:
-                            processed_at = datetime.fromisoformat(processed_at.replace('Z', '+00:00')).strftime('%m/%d %H:%M')
-                        except:
-                            processed_at = 'Unknown'
-                    st.write(f"• {processed_at} - {stat.get('file_type', 'unknown').upper()}")
-            else:
-                st.info("🎯 **No roasts yet!**")
-                st.write("Upload a resume below to get started!")
-                st.write("📈 Your roast statistics will appear here after you've processed some resumes.")
-        
-        # User Preferences
-        with st.expander("⚙️ Roast Preferences", expanded=False):
-            current_prefs = get_user_preferences(user_id)
-            
-            roast_style = st.selectbox(
-                "Roast Style",
-                ["gentle", "balanced", "savage"],
-                index=["gentle", "balanced", "savage"].index(current_prefs.get('roast_style', 'balanced')),
-                help="Choose how brutal you want the AI to be"
-            )
-            
-            humor_level = st.selectbox(
-                "Humor Level", 
-                ["low", "medium", "high"],
-                index=["low", "medium", "high"].index(current_prefs.get('humor_level', 'medium')),
-                help="Control the intensity of jokes and sarcasm"
-            )
-            
-            if st.button("💾 Save Preferences"):
-                new_prefs = {
-                    'roast_style': roast_style,
-                    'humor_level': humor_level
-                }
-                result = store_user_preferences(user_id, new_prefs)
-                if result is not None:
-                    st.success("✅ Preferences actually saved and verified!")
-                    st.rerun()
-                else:
-                    st.error("❌ Failed to save preferences. Check debug messages above.")
+        show_stats_panel(user_id)
+        show_preferences_panel(user_id)
         
         st.markdown("---")
         if st.button("🏠 Back to Landing"):
             st.session_state.page = "landing"
             st.session_state.user_session = None
             st.rerun()
-        logout_button()
+        lazy_import('streamlit_supabase_auth').logout_button()
+        show_rerun_costs()
     
     st.write("---")
     st.write("Upload your resume and let AI roast it! 🔥")
+    show_upload_panel(user_id)
 
-    uploaded_file = st.file_uploader("Upload your resume (PDF or TXT)", type=["pdf", "txt"])
+@st.fragment
+@track_rerun_cost('stats_panel')
+def show_stats_panel(user_id: str):
+    """
+    Sidebar roast statistics (state in: user_id, session stats cache)
+    """
+    with st.expander("📊 Your Roast Stats", expanded=False):
+        user_stats = get_user_stats(user_id)
+        if user_stats['total_roasts'] > 0:
+            total_roasts = user_stats['total_roasts']
+            successful_roasts = user_stats['successful_roasts']
+            avg_processing_time = user_stats['avg_processing_time']
+            
+            st.metric("Total Roasts", total_roasts)
+            st.metric("Success Rate", f"{(successful_roasts/total_roasts)*100:.1f}%")
+            st.metric("Avg Processing Time", f"{avg_processing_time:.2f}s")
+            
+            # Recent activity (newest first)
+            st.write("🕒 **Recent Activity:**")
+            for stat in user_stats['recent_activity']:
+                processed_at = stat.get('processed_at') or 'Unknown'
+                if processed_at != 'Unknown':
+                    try:
+                        processed_at = datetime.fromisoformat(processed_at.replace('Z', '+00:00')).strftime('%m/%d %H:%M')
+                    except:
+                        processed_at = 'Unknown'
+                st.write(f"• {processed_at} - {stat.get('file_type', 'unknown').upper()}")
+        else:
+            st.info("🎯 **No roasts yet!**")
+            st.write("Upload a resume below to get started!")
+            st.write("📈 Your roast statistics will appear here after you've processed some resumes.")
+
+@st.fragment
+@track_rerun_cost('preferences_panel')
+def show_preferences_panel(user_id: str):
+    """
+    Sidebar preferences form (state in: user_id, session preferences cache; out: saved preferences)
+    """
+    with st.expander("⚙️ Roast Preferences", expanded=False):
+        current_prefs = get_user_preferences(user_id)
+        
+        roast_style = st.selectbox(
+            "Roast Style",
+            ["gentle", "balanced", "savage"],
+            index=["gentle", "balanced", "savage"].index(current_prefs.get('roast_style', 'balanced')),
+            help="Choose how brutal you want the AI to be"
+        )
+        
+        humor_level = st.selectbox(
+            "Humor Level", 
+            ["low", "medium", "high"],
+            index=["low", "medium", "high"].index(current_prefs.get('humor_level', 'medium')),
+            help="Control the intensity of jokes and sarcasm"
+        )
+        
+        if st.button("💾 Save Preferences"):
+            new_prefs = {
+                'roast_style': roast_style,
+                'humor_level': humor_level
+            }
+            result = store_user_preferences(user_id, new_prefs)
+            if result is not None:
+                # The session cache is written through, so the next roast picks these up without a page rerun
+                st.success("✅ Preferences actually saved and verified!")
+            else:
+                st.error("❌ Failed to save preferences. Check debug messages above.")
+
+def show_rerun_costs():
+    """
+    Rerun counts and script time per scope, with the time saved by partial reruns
+    """
+    rerun_costs = st.session_state.rerun_costs
+    page_cost = rerun_costs.get('page')
+    partial_runs = sum(cost['runs'] for scope, cost in rerun_costs.items() if scope != 'page')
+    if not page_cost or not partial_runs:
+        return
+    avg_page_seconds = page_cost['seconds'] / page_cost['runs']
+    partial_seconds = sum(cost['seconds'] for scope, cost in rerun_costs.items() if scope != 'page')
+    saved_seconds = max(0.0, avg_page_seconds * partial_runs - partial_seconds)
+    st.caption(f"🔁 {page_cost['runs']} full reruns (avg {avg_page_seconds * 1000:.0f} ms), "
+               f"{partial_runs} panel-only reruns (avg {partial_seconds / partial_runs * 1000:.0f} ms) - "
+               f"saved ~{saved_seconds:.1f}s of script time")
+
+@st.fragment
+@track_rerun_cost('upload_panel')
+def show_upload_panel(user_id: str):
+    """
+    Upload, extraction and roast panel (state in: user_id, uploaded file, session roast_job_id)
+    """
+    uploaded_file = st.file_uploader("Upload your resume (PDF or TXT)", type=["pdf", "txt"],
+                                     max_upload_size=max(1, UPLOAD_MAX_BYTES // (1024 * 1024)))
 
     if uploaded_file:
         resume_text = ""
         file_type = "txt"
         
+        if uploaded_file.size > UPLOAD_MAX_BYTES:
+            st.error(f"📦 {ingestion.UploadTooLargeError(UPLOAD_MAX_BYTES)} - that's a novel, not a resume.")
+            return
+        
         if uploaded_file.type == "application/pdf":
             file_type = "pdf"
+            # Timed-out extractions aren't cached; keep this session from re-parsing on every rerun
+            partial = st.session_state.partial_extractions.get(uploaded_file.file_id)
             try:
-                pdf_reader = PyPDF2.PdfReader(uploaded_file)
-                resume_text = []
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    text = ' '.join(text.split())
-                    resume_text.append(text)
-                resume_text = '\n\n'.join(resume_text)
+                resume_text, extraction_stats = partial or extract_resume_pdf_text(uploaded_file.getvalue())
             except Exception as e:
                 st.error(f"Error reading PDF: {str(e)}")
                 return
+            if extraction_stats['timed_out']:
+                st.session_state.partial_extractions = {uploaded_file.file_id: (resume_text, extraction_stats)}
+                st.warning(f"⏱️ This PDF took too long to read - using the {extraction_stats['pages_extracted']} pages we got through.")
+            elif extraction_stats['pages_truncated']:
+                st.warning(f"📚 Only the first {extraction_stats['pages_extracted']} of {extraction_stats['page_count']} pages will be roasted.")
         else:
-            resume_text = uploaded_file.read().decode("utf-8")
+            try:
+                resume_text, extraction_stats = ingest_resume_text(uploaded_file)
+            except ingestion.UploadTooLargeError as e:
+                st.error(f"📦 {e} - that's a novel, not a resume.")
+                return
+        
+        if extraction_stats['text_truncated']:
+            st.info(f"✂️ Only the first {extraction_stats['chars']:,} characters are read - plenty for a roast.")
+        if st.session_state.get('ingested_file_id') != uploaded_file.file_id:
+            # Count each upload once, not on every rerun that re-reads it
+            st.session_state.ingested_file_id = uploaded_file.file_id
+            metrics.REGISTRY.increment('upload_ingested_bytes_total', extraction_stats['bytes_read'], file_type=file_type)
+            metrics.REGISTRY.increment('upload_ingested_total', file_type=file_type,
+                                       truncated=str(extraction_stats['text_truncated']).lower())
 
         if resume_text:
             # Show file info
@@ -494,46 +1956,130 @@ def show_roast_page():
             with col3:
                 st.info(f"📝 **Length:** {len(resume_text):,} chars")
             
-            if st.button("🌶️ Roast my resume", type="primary"):
-                with st.spinner("🔥 Roasting in progress... (This might hurt a little)"):
-                    # Get current user preferences
-                    user_prefs = get_user_preferences(user_id)
-                    
-                    # Process the resume
-                    roast_result, processing_stats = roast_resume(
-                        resume_text, 
-                        user_id=user_id,
-                        preferences=user_prefs
-                    )
-                    
-                    # Display results
-                    st.subheader("🔥 AI's Roast of Your Resume 🔥")
-                    st.write(roast_result)
-                    
-                    # Show processing stats
-                    if processing_stats.get('success', False):
-                        with st.expander("🤖 Processing Details", expanded=False):
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                st.metric("Processing Time", f"{processing_stats['processing_time']:.2f}s")
-                            with col2:
-                                st.metric("Response Length", f"{processing_stats['roast_length']} chars")
-                            with col3:
-                                st.metric("Model", processing_stats['model_used'].split('-')[0].title())
-                            
-                            st.write(f"**Style:** {processing_stats['roast_style'].title()}")
-                            st.write(f"**Humor Level:** {processing_stats['humor_level'].title()}")
-                    
-                    # Fun follow-up messages
-                    st.markdown("---")
-                    st.success("🎉 Congratulations! You've survived the roast!")
-                    st.info("💡 Remember: Every roast is a chance to improve. Or change careers entirely! 😅")
-                    
-                    # Suggest trying different settings
-                    if user_prefs.get('roast_style') == 'gentle':
-                        st.warning("💪 Feeling brave? Try the 'savage' roast style for maximum destruction!")
-                    elif user_prefs.get('roast_style') == 'savage':
-                        st.info("😌 Need a break from the brutality? Try 'gentle' mode for a more supportive critique.")
+            show_pre_analysis(analyze_resume_text(resume_text))
+            
+            with st.expander("📄 Extraction Details", expanded=False):
+                if file_type == "pdf":
+                    st.write(f"**Pages:** {extraction_stats['pages_extracted']} of {extraction_stats['page_count']}"
+                             f" in {extraction_stats['extraction_time']:.2f}s"
+                             f"{' (parallel)' if extraction_stats['parallel'] else ''}")
+                    st.write("**Per-page time (s):** " + ', '.join(f"{t:.3f}" for t in extraction_stats['page_timings']))
+                else:
+                    replaced_note = (f" ({extraction_stats['replaced_chars']:,} unreadable characters replaced)"
+                                     if extraction_stats['replaced_chars'] else "")
+                    st.write(f"**Encoding:** {extraction_stats['encoding']}{replaced_note}")
+                st.write(f"**Read:** {extraction_stats['bytes_read']:,} bytes → {extraction_stats['chars']:,} characters")
+                st.write(f"**Peak ingestion memory:** {extraction_stats['peak_memory_bytes'] / 1024:,.0f} KB")
+            
+            # A running or finished job for this resume survives reruns and reconnects
+            roast_jobs = get_roast_job_queue()
+            resume_digest = hashlib.sha256(resume_text.encode('utf-8')).hexdigest()
+            job = roast_jobs.get(st.session_state.roast_job_id) or roast_jobs.latest_for_user(user_id, resume_digest)
+            if job is not None and job.resume_digest != resume_digest:
+                job = None
+            
+            if st.button("🌶️ Roast my resume", type="primary", disabled=job is not None and not job.finished):
+                job = roast_jobs.submit(resume_text, user_id, get_user_preferences(user_id), stream=ROAST_STREAMING)
+            
+            if job is not None:
+                st.session_state.roast_job_id = job.job_id
+                if job.finished:
+                    show_roast_result(job)
+                else:
+                    show_roast_progress(job.job_id)
+
+def show_pre_analysis(analysis: dict):
+    """
+    Render the instant local pre-analysis (shown while the AI roast is still on its way)
+    """
+    with st.expander("🔎 Instant Pre-Analysis", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Clichés & Buzzwords", analysis['phrase_hits'])
+        with col2:
+            st.metric("Words", f"{analysis['word_count']:,}")
+        with col3:
+            if analysis['bullet_count']:
+                st.metric("Bullets With Numbers", f"{analysis['quantified_bullets']} / {analysis['bullet_count']}")
+            else:
+                st.metric("Lines With Numbers", f"{analysis['quantified_lines']} / {analysis['line_count']}")
+        
+        if analysis['highlights']:
+            st.write("🚩 **Spotted:** " + ', '.join(
+                f"*{phrase}*" + (f" ×{count}" if count > 1 else '') for phrase, count in analysis['highlights']
+            ))
+        else:
+            st.write("✨ No stock phrases found - the AI will have to work for it.")
+        if analysis['sections']:
+            st.write("📑 **Section sizes (words):** " + ', '.join(
+                f"{name.title()} {words}" for name, words in analysis['sections'].items()
+            ))
+        st.caption(f"Analyzed locally in {analysis['analysis_ms']:.1f} ms")
+
+@st.fragment(run_every=ROAST_JOB_POLL_SECONDS)
+@track_rerun_cost('roast_progress')
+def show_roast_progress(job_id: str):
+    """
+    Poll a running roast job; only this fragment reruns until the job finishes
+    """
+    job = get_roast_job_queue().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    
+    st.subheader("🔥 AI's Roast of Your Resume 🔥")
+    if job.partial_text:
+        st.markdown(job.partial_text + "▌")
+    elif job.status == 'queued':
+        st.info("⏳ Your resume is in line for the roaster...")
+    else:
+        st.info("🔥 Roasting in progress... (This might hurt a little)")
+
+def show_roast_result(job: RoastJob):
+    """
+    Render a finished roast job with its processing details
+    """
+    processing_stats = job.processing_stats
+    user_prefs = job.preferences
+    
+    st.subheader("🔥 AI's Roast of Your Resume 🔥")
+    st.markdown(job.result)
+    
+    # Show processing stats
+    if processing_stats.get('success', False):
+        with st.expander("🤖 Processing Details", expanded=False):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Processing Time", f"{processing_stats['processing_time']:.2f}s")
+                if processing_stats.get('streamed'):
+                    st.caption(f"First words after {processing_stats['time_to_first_token']:.2f}s")
+                if processing_stats.get('queue_wait_time', 0) >= 0.1:
+                    st.caption(f"Waited {processing_stats['queue_wait_time']:.2f}s in line for the AI")
+            with col2:
+                st.metric("Response Length", f"{processing_stats['roast_length']} chars")
+            with col3:
+                st.metric("Model", processing_stats['model_used'].split('-')[0].title())
+            
+            st.write(f"**Style:** {processing_stats['roast_style'].title()}")
+            st.write(f"**Humor Level:** {processing_stats['humor_level'].title()}")
+            if 'sent_tokens' in processing_stats:
+                st.write(f"**Resume Tokens Sent:** {processing_stats['sent_tokens']:,} of {processing_stats['original_tokens']:,}")
+            if processing_stats.get('cache_hit'):
+                st.write("⚡ **Served from cache** - same resume and settings as an earlier roast")
+    
+    ready_variants = [variant.replace('/', ' / ').title() for variant, status in job.variants.items() if status == 'ready']
+    if ready_variants:
+        st.caption(f"⚡ Also ready instantly if you switch preferences: {', '.join(ready_variants)}")
+    
+    # Fun follow-up messages
+    st.markdown("---")
+    st.success("🎉 Congratulations! You've survived the roast!")
+    st.info("💡 Remember: Every roast is a chance to improve. Or change careers entirely! 😅")
+    
+    # Suggest trying different settings
+    if user_prefs.get('roast_style') == 'gentle':
+        st.warning("💪 Feeling brave? Try the 'savage' roast style for maximum destruction!")
+    elif user_prefs.get('roast_style') == 'savage':
+        st.info("😌 Need a break from the brutality? Try 'gentle' mode for a more supportive critique.")
 
 # ======================
 # Main Application
@@ -543,17 +2089,27 @@ def main():
     """
     Main application router
     """
+    if METRICS_PORT:
+        start_metrics_exporter()
+    
     # Route to appropriate page based on session state
     if st.session_state.page == "landing":
-        show_landing_page()
+        with time_stage('render_landing_page'):
+            show_landing_page()
     elif st.session_state.page == "auth":
-        show_auth_page()
+        with time_stage('render_auth_page'):
+            show_auth_page()
     elif st.session_state.page == "roast":
-        show_roast_page()
+        with time_stage('render_roast_page'):
+            show_roast_page()
     else:
         # Default to landing page
         st.session_state.page = "landing"
         st.rerun()
+    
+    # Started after the first render so it never delays first paint
+    if WARM_UP_ON_START:
+        start_warm_up()
 
 # ======================
 # Entry Point
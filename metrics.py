@@ -0,0 +1,245 @@
+import os
+import json
+import glob
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ======================
+# In-Process Metrics
+# ======================
+
+# Histogram bucket upper bounds in seconds (roughly 5 ms .. 60 s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus semantics: cumulative buckets on export)
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by linear interpolation inside the matching bucket
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    """
+    Thread-safe store of labelled histograms and counters.
+    Use span() to time a stage with the monotonic clock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        Time the enclosed block into histogram `name`; failures are counted in
+        a matching `*_errors_total` counter (roast_stage_duration_seconds -> roast_stage_errors_total)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment(name.removesuffix('_seconds').removesuffix('_duration') + '_errors_total', **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        """
+        Plain-dict view: {'histograms': {...}, 'counters': {...}} keyed by 'name{labels}'
+        """
+        with self._lock:
+            histograms = {
+                _series_name(name, labels): {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'p50': histogram.quantile(0.50),
+                    'p95': histogram.quantile(0.95),
+                    'p99': histogram.quantile(0.99)
+                }
+                for (name, labels), histogram in self._histograms.items()
+            }
+            counters = {_series_name(name, labels): value for (name, labels), value in self._counters.items()}
+        return {'histograms': histograms, 'counters': counters}
+
+    def dump_state(self) -> dict:
+        """
+        Raw bucket counts and counter values as JSON-serializable data (see merge_state)
+        """
+        with self._lock:
+            return {
+                'histograms': [
+                    [name, list(labels), list(histogram.buckets), list(histogram.bucket_counts), histogram.count, histogram.sum]
+                    for (name, labels), histogram in self._histograms.items()
+                ],
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'help': dict(self._help)
+            }
+
+    def merge_state(self, state: dict):
+        """
+        Add another registry's dump_state() into this one (e.g. from another worker process)
+        """
+        with self._lock:
+            for name, labels, buckets, bucket_counts, count, total in state.get('histograms', []):
+                key = (name, tuple(tuple(label) for label in labels))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                for index, bucket_count in enumerate(bucket_counts):
+                    histogram.bucket_counts[index] += bucket_count
+                histogram.count += count
+                histogram.sum += total
+            for name, labels, value in state.get('counters', []):
+                key = (name, tuple(tuple(label) for label in labels))
+                self._counters[key] = self._counters.get(key, 0.0) + value
+            for name, help_text in state.get('help', {}).items():
+                self._help.setdefault(name, help_text)
+
+    def render_prometheus(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        with self._lock:
+            for family in sorted({name for name, _ in self._histograms}):
+                if family in self._help:
+                    lines.append(f"# HELP {family} {self._help[family]}")
+                lines.append(f"# TYPE {family} histogram")
+                for (name, labels), histogram in sorted(self._histograms.items()):
+                    if name != family:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets + (float('inf'),), histogram.bucket_counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{family}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{family}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{family}_count{_format_labels(labels)} {histogram.count}")
+            for family in sorted({name for name, _ in self._counters}):
+                if family in self._help:
+                    lines.append(f"# HELP {family} {self._help[family]}")
+                lines.append(f"# TYPE {family} counter")
+                for (name, labels), value in sorted(self._counters.items()):
+                    if name == family:
+                        lines.append(f"{family}{_format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + '}'
+
+def _series_name(name: str, labels: tuple) -> str:
+    return name + _format_labels(labels)
+
+# Default process-wide registry
+REGISTRY = MetricsRegistry()
+
+# ======================
+# Multi-Process Aggregation
+# ======================
+#
+# Each worker process periodically writes its registry to <directory>/<name>.json;
+# any worker can then serve the sum of all of them.
+
+def write_state_file(registry: MetricsRegistry, directory: str, name: str):
+    """
+    Atomically replace <directory>/<name>.json with the registry's current state
+    """
+    path = os.path.join(directory, f"{name}.json")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as state_file:
+        json.dump(registry.dump_state(), state_file)
+    os.replace(temp_path, path)
+
+def aggregate_state_files(directory: str) -> MetricsRegistry:
+    """
+    New registry holding the sum of every state file in directory
+    """
+    combined = MetricsRegistry()
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        try:
+            with open(path, encoding='utf-8') as state_file:
+                combined.merge_state(json.load(state_file))
+        except (OSError, ValueError):
+            continue  # Worker exited or is mid-write
+    return combined
+
+# ======================
+# Prometheus Exporter
+# ======================
+
+def start_metrics_server(registry: MetricsRegistry = REGISTRY, host: str = '127.0.0.1',
+                         port: int = 9464) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics in Prometheus text format from a daemon thread.
+    The endpoint has no auth, so it listens on loopback unless host says otherwise.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
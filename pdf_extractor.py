@@ -0,0 +1,132 @@
+import io
+import sys
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from startup import lazy_import
+
+# ======================
+# PDF Text Extraction
+# ======================
+#
+# Lives outside main.py so process-pool workers can import it by name
+# (functions defined in the Streamlit script itself cannot be pickled).
+
+def extract_pages(file_bytes: bytes, start: int, stop: int) -> list:
+    """
+    Extract pages [start, stop) from a PDF.
+    Returns a list of (page_number, text, seconds) tuples.
+    """
+    pdf_reader = lazy_import('PyPDF2').PdfReader(io.BytesIO(file_bytes))
+    pages = []
+    for page_number in range(start, min(stop, len(pdf_reader.pages))):
+        page_start = time.perf_counter()
+        text = pdf_reader.pages[page_number].extract_text() or ''
+        text = ' '.join(text.split())
+        pages.append((page_number, text, time.perf_counter() - page_start))
+    return pages
+
+def count_pages(file_bytes: bytes) -> int:
+    """
+    Number of pages in a PDF
+    """
+    return len(lazy_import('PyPDF2').PdfReader(io.BytesIO(file_bytes)).pages)
+
+def terminate_executor(executor):
+    """
+    Kill a process pool whose workers are stuck on a pathological PDF.
+    ProcessPoolExecutor has no public way to stop running tasks, so the
+    worker processes are terminated directly.
+    """
+    for process in list(getattr(executor, '_processes', {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def extract_pdf_text(file_bytes: bytes, executor=None, max_pages: int = 50, timeout: float = 20.0,
+                     parallel_min_pages: int = 8, pages_per_task: int = 4, max_chars: int = None) -> tuple[str, dict]:
+    """
+    Extract text from a PDF, capped at max_pages and timeout seconds.
+    With an executor (a ProcessPoolExecutor) all parsing happens in its workers,
+    so a stuck document can't hold the caller past the timeout; documents with
+    at least parallel_min_pages pages are split into chunks of pages_per_task
+    pages, smaller ones go to a single worker. Without one, pages are parsed
+    in-process and the timeout is only checked between chunks.
+    With max_chars, extraction stops once that much text has been collected
+    (in page order) and the text is cut to max_chars.
+    Returns tuple of (text, extraction_stats); if the timeout hits, the text holds
+    whatever pages finished and extraction_stats['timed_out'] is True.
+    """
+    start_time = time.perf_counter()
+    deadline = start_time + timeout
+    timed_out = False
+    text_truncated = False
+    pages = []
+    chars = 0
+    if executor is not None:
+        try:
+            page_count = executor.submit(count_pages, file_bytes).result(timeout=timeout)
+        except FuturesTimeoutError:
+            page_count = 0
+            timed_out = True
+    else:
+        page_count = count_pages(file_bytes)
+    pages_to_extract = min(page_count, max_pages)
+    if executor is not None and pages_to_extract < parallel_min_pages:
+        pages_per_task = max(pages_to_extract, 1)
+    chunk_starts = range(0, pages_to_extract, pages_per_task)
+    parallel = executor is not None and len(chunk_starts) > 1
+
+    if executor is not None:
+        futures = [
+            executor.submit(extract_pages, file_bytes, start, min(start + pages_per_task, pages_to_extract))
+            for start in chunk_starts
+        ]
+        # Collected in page order so the character budget keeps the start of the document
+        for index, future in enumerate(futures):
+            try:
+                chunk = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except FuturesTimeoutError:
+                timed_out = True
+                # Keep later chunks that already finished
+                for finished in futures[index + 1:]:
+                    if finished.done() and not finished.cancelled() and finished.exception() is None:
+                        pages.extend(finished.result())
+                break
+            pages.extend(chunk)
+            chars += sum(len(page_text) for _, page_text, _ in chunk)
+            if max_chars and chars >= max_chars:
+                text_truncated = index + 1 < len(futures)
+                break
+        for future in futures:
+            future.cancel()
+    else:
+        for start in chunk_starts:
+            if time.perf_counter() > deadline:
+                timed_out = True
+                break
+            if max_chars and chars >= max_chars:
+                text_truncated = True
+                break
+            chunk = extract_pages(file_bytes, start, min(start + pages_per_task, pages_to_extract))
+            pages.extend(chunk)
+            chars += sum(len(page_text) for _, page_text, _ in chunk)
+
+    pages.sort(key=lambda page: page[0])
+    text = '\n\n'.join(page_text for _, page_text, _ in pages)
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars]
+        text_truncated = True
+
+    extraction_stats = {
+        'page_count': page_count,
+        'pages_extracted': len(pages),
+        'pages_truncated': page_count > max_pages,
+        'text_truncated': text_truncated,
+        'page_timings': [round(seconds, 4) for _, _, seconds in pages],
+        'extraction_time': time.perf_counter() - start_time,
+        'parallel': parallel,
+        'timed_out': timed_out,
+        # Page texts and the joined text are both alive at the join
+        'text_memory_bytes': sum(sys.getsizeof(page_text) for _, page_text, _ in pages) + sys.getsizeof(text)
+    }
+    return text, extraction_stats
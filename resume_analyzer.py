@@ -0,0 +1,200 @@
+"""
+Instant local pre-analysis of resume text: runs on the CPU in a few
+milliseconds, so its findings can be shown while the LLM roast is in flight.
+
+A compiled Aho-Corasick automaton finds every cliché/buzzword in one linear
+pass over the text, and line-level statistics (section sizes, bullets,
+quantified achievements) come from a single pass over the lines. Only the
+standard library is used, so importing this module stays cheap.
+"""
+import re
+import time
+from collections import deque
+from itertools import accumulate
+
+# ======================
+# Phrase Dictionary
+# ======================
+
+# phrase -> category; matched case-insensitively on word boundaries
+RESUME_PHRASES = {
+    # Buzzwords
+    'synergy': 'buzzword', 'synergies': 'buzzword', 'leverage': 'buzzword', 'leveraged': 'buzzword',
+    'paradigm shift': 'buzzword', 'thought leader': 'buzzword', 'thought leadership': 'buzzword',
+    'disruptive': 'buzzword', 'game changer': 'buzzword', 'game-changer': 'buzzword',
+    'best of breed': 'buzzword', 'value add': 'buzzword', 'value-add': 'buzzword',
+    'move the needle': 'buzzword', 'low-hanging fruit': 'buzzword', 'circle back': 'buzzword',
+    'rockstar': 'buzzword', 'ninja': 'buzzword', 'guru': 'buzzword', 'wizard': 'buzzword',
+    'innovative': 'buzzword', 'cutting-edge': 'buzzword', 'cutting edge': 'buzzword',
+    'world-class': 'buzzword', 'best-in-class': 'buzzword', 'next-generation': 'buzzword',
+    'holistic': 'buzzword', 'scalable solutions': 'buzzword', 'strategic thinker': 'buzzword',
+    'visionary': 'buzzword', 'dynamic': 'buzzword', 'robust': 'buzzword', 'seamless': 'buzzword',
+    # Clichés
+    'team player': 'cliche', 'hard worker': 'cliche', 'hard-working': 'cliche', 'hardworking': 'cliche',
+    'detail-oriented': 'cliche', 'detail oriented': 'cliche', 'results-driven': 'cliche',
+    'results driven': 'cliche', 'results-oriented': 'cliche', 'self-starter': 'cliche',
+    'self starter': 'cliche', 'go-getter': 'cliche', 'think outside the box': 'cliche',
+    'out of the box': 'cliche', 'passionate about': 'cliche', 'highly motivated': 'cliche',
+    'self-motivated': 'cliche', 'fast learner': 'cliche', 'quick learner': 'cliche',
+    'fast-paced environment': 'cliche', 'excellent communication skills': 'cliche',
+    'strong communication skills': 'cliche', 'works well under pressure': 'cliche',
+    'proven track record': 'cliche', 'track record of success': 'cliche', 'people person': 'cliche',
+    'go above and beyond': 'cliche', 'wear many hats': 'cliche', 'perfectionist': 'cliche',
+    'dedicated professional': 'cliche', 'seasoned professional': 'cliche',
+    # Filler and weak verbs
+    'responsible for': 'filler', 'duties included': 'filler', 'worked on': 'filler',
+    'helped with': 'filler', 'assisted with': 'filler', 'involved in': 'filler',
+    'participated in': 'filler', 'various tasks': 'filler', 'etc': 'filler',
+    'references available upon request': 'filler', 'references available on request': 'filler',
+    'microsoft office': 'filler', 'proficient in microsoft word': 'filler',
+}
+
+# ======================
+# Multi-Pattern Matcher
+# ======================
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of lowercase phrases.
+    find() scans the text once, whatever the number of phrases.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = sorted(set(phrase.lower() for phrase in phrases))
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]  # Indexes into self.phrases ending at each state
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+        # Breadth-first failure links; each state inherits the outputs of its fallback
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> list:
+        """
+        Whole-word matches in text as (start, end, phrase) tuples, in order of their end position
+        """
+        lowered = text.lower()
+        goto, fail, output, phrases = self._goto, self._fail, self._output, self.phrases
+        matches = []
+        state = 0
+        for position, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = position + 1
+            for index in output[state]:
+                phrase = phrases[index]
+                start = end - len(phrase)
+                if (start == 0 or not lowered[start - 1].isalnum()) and (end == len(lowered) or not lowered[end].isalnum()):
+                    matches.append((start, end, phrase))
+        return matches
+
+_default_matcher = None
+
+def get_default_matcher() -> PhraseMatcher:
+    """
+    Matcher for RESUME_PHRASES, compiled on first use
+    """
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = PhraseMatcher(RESUME_PHRASES)
+    return _default_matcher
+
+# ======================
+# Resume Analysis
+# ======================
+
+_BULLET_PATTERN = re.compile(r'^\s*(?:[-*•▪◦●‣]|\d+[.)])\s+')
+_QUANTIFIED_PATTERN = re.compile(r'\d+(?:[.,]\d+)?\s*(?:%|percent|x\b|k\b|m\b|\+)|[$€£]\s*\d|\b\d{2,}\b')
+
+def analyze_resume(resume_text: str, matcher: PhraseMatcher = None, section_pattern=None,
+                   max_highlights: int = 8) -> dict:
+    """
+    Cliché/buzzword hits plus length and section statistics for resume_text.
+    section_pattern is an optional compiled regex matching section headings
+    (main.py passes the one used for prompt compaction).
+    """
+    start_time = time.perf_counter()
+    matcher = matcher or get_default_matcher()
+
+    phrase_counts = {}
+    category_counts = {}
+    for _, _, phrase in matcher.find(resume_text):
+        phrase_counts[phrase] = phrase_counts.get(phrase, 0) + 1
+        category = RESUME_PHRASES.get(phrase, 'buzzword')
+        category_counts[category] = category_counts.get(category, 0) + 1
+    highlights = sorted(phrase_counts.items(), key=lambda item: (-item[1], item[0]))[:max_highlights]
+
+    lines = [line.strip() for line in resume_text.splitlines()]
+    lines = [line for line in lines if line] or ['']
+    line_lengths = [len(line) for line in lines]
+    word_counts = [len(line.split()) for line in lines]
+    is_bullet = [bool(_BULLET_PATTERN.match(line)) for line in lines]
+    is_quantified = [bool(_QUANTIFIED_PATTERN.search(line)) for line in lines]
+    bullet_count = sum(is_bullet)
+
+    # Section sizes: words between consecutive headings (cumulative sums, no per-section loop)
+    sections = {}
+    if section_pattern is not None:
+        heading_rows = [index for index, line in enumerate(lines) if section_pattern.fullmatch(line.rstrip(':'))]
+        if heading_rows:
+            cumulative_words = list(accumulate(word_counts, initial=0))
+            bounds = heading_rows + [len(lines)]
+            section_words = [cumulative_words[end] - cumulative_words[start + 1] for start, end in zip(bounds, bounds[1:])]
+            for row, words in zip(heading_rows, section_words):
+                name = lines[row].rstrip(':').strip().lower()
+                sections[name] = sections.get(name, 0) + words
+
+    word_count = sum(word_counts)
+    return {
+        'word_count': word_count,
+        'line_count': len(lines),
+        'avg_line_length': sum(line_lengths) / len(line_lengths),
+        'longest_line': max(line_lengths),
+        'bullet_count': bullet_count,
+        'quantified_bullets': sum(bullet and quantified for bullet, quantified in zip(is_bullet, is_quantified)),
+        'quantified_lines': sum(is_quantified),
+        'sections': sections,
+        'phrase_hits': sum(phrase_counts.values()),
+        'category_counts': category_counts,
+        'buzzword_density': sum(phrase_counts.values()) / word_count * 100 if word_count else 0.0,
+        'highlights': highlights,
+        'analysis_ms': (time.perf_counter() - start_time) * 1000
+    }
+
+def format_for_prompt(analysis: dict, max_phrases: int = 6) -> str:
+    """
+    One-line summary of the analysis, compact enough to add to the LLM prompt
+    """
+    parts = []
+    if analysis['highlights']:
+        phrases = ', '.join(
+            f'"{phrase}"' + (f" x{count}" if count > 1 else '')
+            for phrase, count in analysis['highlights'][:max_phrases]
+        )
+        parts.append(f"clichés/buzzwords: {phrases}")
+    if analysis['bullet_count']:
+        parts.append(f"{analysis['quantified_bullets']} of {analysis['bullet_count']} bullets have numbers")
+    parts.append(f"{analysis['word_count']} words")
+    return "Pre-scan findings - " + '; '.join(parts)
@@ -0,0 +1,353 @@
+"""
+Headless HTTP API for roasting resumes without a Streamlit session.
+
+Runs several worker processes on one port (SO_REUSEPORT: the kernel spreads
+connections across them) so roast throughput scales with cores separately
+from the UI. Workers share the SQLite roast cache (ROAST_CACHE_DB_PATH) and
+write their metrics to a shared directory, so GET /metrics on any worker
+returns the totals for all of them.
+
+Endpoints:
+    GET  /healthz                  liveness
+    GET  /metrics                  Prometheus metrics summed over all workers
+    GET  /v1/stats                 this worker's LLM/cache state
+    POST /v1/extract               raw PDF/TXT body -> {"text": ..., "file_type": ...}
+    POST /v1/roast                 {"text": ..., "roast_style": ..., "humor_level": ...}
+                                   (or "pdf_base64" instead of "text") -> {"roast": ..., "processing_stats": ...}
+
+The API only knows a shared bearer token, not which user is calling, so roasts
+are anonymous: they aren't logged against a user and user stats aren't served.
+It listens on 127.0.0.1 by default and won't bind another address unless
+ROAST_API_TOKEN is set; /metrics then requires the token as well.
+
+Usage:
+    python roast_api.py --port 8080 --workers 4
+    curl -s localhost:8080/v1/roast -d '{"text": "Results-driven team player..."}'
+    ROAST_API_TOKEN=... python roast_api.py --host 0.0.0.0
+"""
+import os
+import glob
+import hmac
+import json
+import time
+import base64
+import signal
+import socket
+import argparse
+import tempfile
+import ipaddress
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from dotenv import load_dotenv
+
+import metrics
+import ingestion
+
+load_dotenv()
+
+API_METRIC = 'api_request_duration_seconds'
+metrics.REGISTRY.describe(API_METRIC, "Roast API request time by route and status code")
+
+# Largest request body accepted (PDF uploads included)
+ROAST_API_MAX_BODY_BYTES = int(os.getenv('ROAST_API_MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+# If set, /v1/* requires "Authorization: Bearer <token>"; required to listen beyond loopback
+ROAST_API_TOKEN = os.getenv('ROAST_API_TOKEN')
+# How often each worker writes its metrics for the others to aggregate
+ROAST_API_METRICS_INTERVAL = float(os.getenv('ROAST_API_METRICS_INTERVAL', '5'))
+
+class APIError(Exception):
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+# ======================
+# Request Handler
+# ======================
+
+class RoastAPIHandler(BaseHTTPRequestHandler):
+    """
+    JSON API over main.py's roast_resume, PDF extraction and stats
+    """
+
+    app = None  # The imported main module, set by run_worker
+    worker_name = 'worker-0'
+    metrics_dir = None
+    protect_metrics = False  # /metrics needs the token too when reachable beyond loopback
+
+    def do_GET(self):
+        self._dispatch({
+            '/healthz': self._health,
+            '/metrics': self._metrics,
+            '/v1/stats': self._stats
+        })
+
+    def do_POST(self):
+        self._dispatch({
+            '/v1/extract': self._extract,
+            '/v1/roast': self._roast
+        })
+
+    def _dispatch(self, routes: dict):
+        start = time.perf_counter()
+        route = urlparse(self.path).path.rstrip('/') or '/'
+        handler = routes.get(route)
+        status = 404
+        try:
+            if handler is None:
+                raise APIError(404, f"Unknown path {route}")
+            if route.startswith('/v1/') or (route == '/metrics' and self.protect_metrics):
+                self._check_token()
+            status = handler()
+        except APIError as e:
+            status = e.status
+            self._send_json(status, {'error': str(e)}, retry_after=e.retry_after)
+        except Exception as e:
+            status = 500
+            self._send_json(status, {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            metrics.REGISTRY.observe(API_METRIC, time.perf_counter() - start,
+                                     route=route if handler else 'unknown', status=str(status))
+
+    def _check_token(self):
+        if not ROAST_API_TOKEN:
+            return
+        # Constant-time comparison, so response timing doesn't leak how much of the token matched
+        supplied = (self.headers.get('Authorization') or '').encode('utf-8')
+        if not hmac.compare_digest(supplied, f"Bearer {ROAST_API_TOKEN}".encode('utf-8')):
+            raise APIError(401, "Missing or invalid bearer token")
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > ROAST_API_MAX_BODY_BYTES:
+            raise APIError(413, f"Request body over {ROAST_API_MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length)
+
+    def _read_json(self) -> dict:
+        try:
+            payload = json.loads(self._read_body() or b'{}')
+        except ValueError:
+            raise APIError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise APIError(400, "Body must be a JSON object")
+        return payload
+
+    def _health(self) -> int:
+        return self._send_json(200, {'status': 'ok', 'worker': self.worker_name, 'pid': os.getpid()})
+
+    def _metrics(self) -> int:
+        registry = metrics.REGISTRY
+        if self.metrics_dir:
+            # Refresh this worker's file so the response includes everything up to now
+            metrics.write_state_file(metrics.REGISTRY, self.metrics_dir, self.worker_name)
+            registry = metrics.aggregate_state_files(self.metrics_dir)
+        body = registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return 200
+
+    def _stats(self) -> int:
+        app = self.app
+        if 'user_id' in parse_qs(urlparse(self.path).query):
+            raise APIError(400, "Per-user stats aren't available over the API; callers aren't authenticated as users")
+        guard = app.get_llm_guard()
+        return self._send_json(200, {
+            'worker': self.worker_name,
+            'pid': os.getpid(),
+            'llm_admission': guard.admission.stats(),
+            'llm_circuit': guard.breaker.state,
+            'roast_cache': app.get_roast_cache().stats()
+        })
+
+    def _extract(self) -> int:
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip()
+        text, file_type, ingest_stats = self._extract_text(self._read_body(), content_type)
+        return self._send_json(200, {'text': text, 'file_type': file_type, 'ingest_stats': ingest_stats})
+
+    def _extract_text(self, body: bytes, content_type: str) -> tuple:
+        if not body:
+            raise APIError(400, "Empty document")
+        is_pdf = content_type == 'application/pdf' or body.startswith(b'%PDF')
+        try:
+            if is_pdf:
+                # Through the app's process pool, so a stuck PDF can't pin this handler thread
+                text, ingest_stats = self.app.extract_resume_pdf_text(body)
+            else:
+                text, ingest_stats = ingestion.ingest_bytes(
+                    body, self.app.UPLOAD_MAX_BYTES, self.app.INGEST_MAX_CHARS, is_pdf=False
+                )
+        except ingestion.UploadTooLargeError as e:
+            raise APIError(413, str(e))
+        except Exception as e:
+            raise APIError(422, f"Could not read {'PDF' if is_pdf else 'document'}: {e}")
+        return text, ingest_stats['file_type'], ingest_stats
+
+    def _roast(self) -> int:
+        app = self.app
+        payload = self._read_json()
+        if 'user_id' in payload:
+            # Only a shared token is checked, so a client-supplied user_id can't be trusted
+            raise APIError(400, "user_id is not accepted; API roasts aren't tied to a user account")
+        if payload.get('pdf_base64'):
+            try:
+                pdf_bytes = base64.b64decode(payload['pdf_base64'], validate=True)
+            except ValueError:
+                raise APIError(400, "pdf_base64 is not valid base64")
+            resume_text, _, _ = self._extract_text(pdf_bytes, 'application/pdf')
+        else:
+            resume_text = payload.get('text')
+        if not isinstance(resume_text, str) or not resume_text.strip():
+            raise APIError(400, "Provide the resume as non-empty 'text' or 'pdf_base64'")
+        # Same bound as uploaded files: anything past INGEST_MAX_CHARS would be compacted away anyway
+        resume_text = resume_text[:app.INGEST_MAX_CHARS]
+
+        preferences = {
+            'roast_style': payload.get('roast_style', 'balanced'),
+            'humor_level': payload.get('humor_level', 'medium')
+        }
+        if preferences['roast_style'] not in app.ROAST_STYLES or preferences['humor_level'] not in app.HUMOR_LEVELS:
+            raise APIError(400, f"roast_style must be one of {app.ROAST_STYLES}, humor_level one of {app.HUMOR_LEVELS}")
+
+        roast, processing_stats = app.roast_resume(resume_text, preferences=preferences)
+        if processing_stats.get('success'):
+            return self._send_json(200, {'roast': roast, 'processing_stats': processing_stats})
+        # Upstream trouble: tell clients when retrying makes sense
+        status = 503 if processing_stats.get('retryable') else 502
+        return self._send_json(status, {'error': processing_stats.get('error'), 'processing_stats': processing_stats},
+                               retry_after=processing_stats.get('retry_after'))
+
+    def _send_json(self, status: int, payload: dict, retry_after: float = None) -> int:
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if retry_after:
+            self.send_header('Retry-After', str(max(1, round(retry_after))))
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def log_message(self, format, *args):
+        pass
+
+# ======================
+# Worker Processes
+# ======================
+
+class RoastAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every worker binds the same port; the kernel balances connections between them
+    allow_reuse_port = True
+
+def run_worker(host: str, port: int, worker_name: str, metrics_dir: str = None):
+    """
+    Serve the API in this process until terminated
+    """
+    # The processing log spool is only locked within a process, so each worker replays its own file
+    spool_path = os.getenv('PROCESSING_LOG_SPOOL_PATH', 'processing_logs.spool.jsonl')
+    os.environ['PROCESSING_LOG_SPOOL_PATH'] = f"{spool_path}.{worker_name}"
+    import main as app  # Loads .env settings, the LLM backend and the shared caches
+
+    RoastAPIHandler.app = app
+    RoastAPIHandler.worker_name = worker_name
+    RoastAPIHandler.metrics_dir = metrics_dir
+    RoastAPIHandler.protect_metrics = not is_loopback_host(host)
+    server = RoastAPIServer((host, port), RoastAPIHandler)
+
+    if metrics_dir:
+        def publish_metrics():
+            while True:
+                metrics.write_state_file(metrics.REGISTRY, metrics_dir, worker_name)
+                time.sleep(ROAST_API_METRICS_INTERVAL)
+        threading.Thread(target=publish_metrics, name="metrics-publisher", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"  {worker_name} (pid {os.getpid()}) listening on http://{host}:{port}", flush=True)
+    server.serve_forever()
+    server.server_close()
+
+def serve(host: str, port: int, workers: int, metrics_dir: str):
+    """
+    Start `workers` worker processes and restart any that die until interrupted
+    """
+    # State files go in a subdirectory of our own, so nothing else in metrics_dir is touched or aggregated
+    metrics_dir = os.path.join(metrics_dir, 'roast-api-workers')
+    os.makedirs(metrics_dir, exist_ok=True)
+    for stale_file in glob.glob(os.path.join(metrics_dir, 'worker-*.json')):
+        os.remove(stale_file)
+
+    # Spawned, not forked: each worker starts clean instead of inheriting the parent's threads
+    context = multiprocessing.get_context('spawn')
+    processes = {}
+
+    def start(index: int):
+        process = context.Process(target=run_worker, args=(host, port, f"worker-{index}", metrics_dir),
+                                  name=f"roast-api-worker-{index}")
+        process.start()
+        processes[index] = process
+
+    for index in range(workers):
+        start(index)
+    try:
+        while True:
+            time.sleep(1.0)
+            for index, process in list(processes.items()):
+                if not process.is_alive():
+                    print(f"  ⚠️ worker-{index} exited with code {process.exitcode}; restarting", flush=True)
+                    start(index)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(timeout=10)
+
+def is_loopback_host(host: str) -> bool:
+    """
+    Whether host only accepts connections from this machine
+    """
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless HTTP API for resume roasting")
+    parser.add_argument('--host', default=os.getenv('ROAST_API_HOST', '127.0.0.1'),
+                        help="Address to listen on (default: 127.0.0.1; other addresses need ROAST_API_TOKEN)")
+    parser.add_argument('--port', type=int, default=int(os.getenv('ROAST_API_PORT', '8080')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('ROAST_API_WORKERS', str(os.cpu_count() or 1))),
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument('--metrics-dir', help="Directory where workers share metrics, in a roast-api-workers/ "
+                                              "subdirectory (default: a temp dir)")
+    args = parser.parse_args()
+    if not ROAST_API_TOKEN and not is_loopback_host(args.host):
+        # Anyone who can reach the port could spend the OpenAI budget
+        parser.error(f"refusing to listen on {args.host} without ROAST_API_TOKEN; set it or use --host 127.0.0.1")
+
+    workers = max(1, args.workers)
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        print("⚠️ This platform has no SO_REUSEPORT; running a single worker")
+        workers = 1
+    if workers > 1 and not os.getenv('ROAST_CACHE_DB_PATH'):
+        # Workers only see each other's roasts through the on-disk cache tier
+        os.environ['ROAST_CACHE_DB_PATH'] = 'roast_cache.sqlite3'
+
+    print(f"\n🔥 Roast API: {workers} worker(s) on port {args.port}, "
+          f"roast cache {os.getenv('ROAST_CACHE_DB_PATH') or 'in memory'}")
+    if workers == 1:
+        run_worker(args.host, args.port, 'worker-0')
+        return
+    serve(args.host, args.port, workers, args.metrics_dir or tempfile.mkdtemp(prefix='roast-api-metrics-'))
+
+if __name__ == "__main__":
+    main()
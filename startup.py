@@ -0,0 +1,122 @@
+"""
+Cold-start helpers: lazy imports of heavy dependencies and an import-cost report.
+
+Modules like openai and supabase take hundreds of milliseconds to import, so
+main.py only imports them on the pages that need them. Each lazy import is
+timed into the metrics registry (startup_import_duration_seconds{module=...}).
+
+Profile what importing the app costs, per top-level package:
+
+    python startup.py
+    python startup.py --top 25 --json startup_report.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+import threading
+
+import metrics
+
+IMPORT_METRIC = 'startup_import_duration_seconds'
+metrics.REGISTRY.describe(IMPORT_METRIC, "Time spent importing each lazily loaded dependency")
+
+# ======================
+# Lazy Imports
+# ======================
+
+_import_lock = threading.Lock()
+_import_timings = {}
+
+def lazy_import(module_name: str):
+    """
+    Import a module on first use and record how long the import took
+    """
+    already_imported = module_name in sys.modules
+    start = time.perf_counter()
+    # Always through importlib, even when the module is in sys.modules: while another
+    # thread (e.g. the warm-up) is still importing it, this waits on the per-module
+    # import lock instead of returning a half-initialized module
+    module = importlib.import_module(module_name)
+    if not already_imported:
+        elapsed = time.perf_counter() - start
+        with _import_lock:
+            if module_name not in _import_timings:
+                _import_timings[module_name] = elapsed
+                metrics.REGISTRY.observe(IMPORT_METRIC, elapsed, module=module_name)
+    return module
+
+def import_timings() -> dict:
+    """
+    Seconds spent importing each lazily loaded module in this process, slowest first
+    """
+    with _import_lock:
+        return dict(sorted(_import_timings.items(), key=lambda item: item[1], reverse=True))
+
+# ======================
+# Startup Timing Report
+# ======================
+
+def profile_imports(module_name: str = 'main', cwd: str = None) -> dict:
+    """
+    Import module_name in a fresh interpreter under `python -X importtime` and
+    total the cumulative time (seconds) of the modules it imports directly,
+    grouped by top-level package
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module_name}"],
+        cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    per_package = {}
+    total = 0.0
+    children = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # The tree is printed children-first, indented two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        seconds = int(cumulative) / 1_000_000
+        if depth == 1:
+            children.append((name.strip(), seconds))
+        elif depth == 0:
+            if name.strip() == module_name:
+                total = seconds
+                for child, child_seconds in children:
+                    package = child.split('.')[0]
+                    per_package[package] = per_package.get(package, 0.0) + child_seconds
+            children = []
+    return {
+        'module': module_name,
+        'returncode': completed.returncode,
+        'total_seconds': total,
+        'packages': dict(sorted(per_package.items(), key=lambda item: item[1], reverse=True))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-package import cost of the app's cold start")
+    parser.add_argument('--module', default='main', help="Module to import (default: main)")
+    parser.add_argument('--top', type=int, default=15, help="Packages to list")
+    parser.add_argument('--json', dest='json_path', help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    report = profile_imports(args.module)
+    print(f"\n🚀 Cold import of '{report['module']}': {report['total_seconds'] * 1000:.0f} ms")
+    for package, seconds in list(report['packages'].items())[:args.top]:
+        share = seconds / report['total_seconds'] * 100 if report['total_seconds'] else 0.0
+        print(f"  {package:<28} {seconds * 1000:8.1f} ms  {share:5.1f}%")
+    if report['returncode']:
+        print(f"  ⚠️ Import exited with code {report['returncode']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+        print(f"  Report written to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
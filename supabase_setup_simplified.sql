@@ -9,6 +9,7 @@
 -- Table for logging AI processing events (privacy-friendly)
 CREATE TABLE IF NOT EXISTS processing_logs (
     id BIGSERIAL PRIMARY KEY,
+    event_id UUID, -- Client-generated, makes retried inserts idempotent
     user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
     file_type VARCHAR(10) NOT NULL CHECK (file_type IN ('pdf', 'txt', 'unknown')),
     processing_time_seconds DECIMAL(10,3) NOT NULL,
@@ -33,9 +34,43 @@ CREATE TABLE IF NOT EXISTS ai_model_metrics (
     average_processing_time DECIMAL(10,3),
     success_rate DECIMAL(5,2),
     total_requests INTEGER DEFAULT 0,
+    successful_requests INTEGER NOT NULL DEFAULT 0,
+    total_processing_time DECIMAL(14,3) NOT NULL DEFAULT 0,
+    prompt_tokens BIGINT NOT NULL DEFAULT 0,
+    completion_tokens BIGINT NOT NULL DEFAULT 0,
+    latency_bucket_bounds DECIMAL[],
+    latency_bucket_counts INTEGER[],
+    latency_p50 DECIMAL(10,3),
+    latency_p95 DECIMAL(10,3),
+    latency_p99 DECIMAL(10,3),
     last_updated TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Idempotency key for the app's batched log writer (for databases created before it)
+ALTER TABLE processing_logs ADD COLUMN IF NOT EXISTS event_id UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_processing_logs_event_id ON processing_logs(event_id);
+
+-- Columns added for aggregated metrics flushes (for databases created before them)
+ALTER TABLE ai_model_metrics
+    ADD COLUMN IF NOT EXISTS successful_requests INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_processing_time DECIMAL(14,3) NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS prompt_tokens BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS completion_tokens BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS latency_bucket_bounds DECIMAL[],
+    ADD COLUMN IF NOT EXISTS latency_bucket_counts INTEGER[],
+    ADD COLUMN IF NOT EXISTS latency_p50 DECIMAL(10,3),
+    ADD COLUMN IF NOT EXISTS latency_p95 DECIMAL(10,3),
+    ADD COLUMN IF NOT EXISTS latency_p99 DECIMAL(10,3);
+
+-- Seed the new running totals from the old averages so the first flush doesn't
+-- overwrite a row's history; only touches rows that predate the columns
+UPDATE ai_model_metrics SET
+    total_processing_time = COALESCE(average_processing_time, 0) * total_requests,
+    successful_requests = ROUND(COALESCE(success_rate, 0) * total_requests / 100)
+WHERE total_requests > 0
+    AND successful_requests = 0
+    AND total_processing_time = 0;
+
 -- STEP 2: Enable Row Level Security
 -- ==============================================
 
@@ -76,7 +111,222 @@ CREATE INDEX IF NOT EXISTS idx_processing_logs_user_date ON processing_logs(user
 CREATE INDEX IF NOT EXISTS idx_user_preferences_user_id ON user_preferences(user_id);
 CREATE INDEX IF NOT EXISTS idx_ai_model_metrics_name ON ai_model_metrics(model_name);
 
--- STEP 5: Grant Permissions
+-- STEP 5: Create Stats Function (used by the sidebar "Your Roast Stats" panel)
+-- ==============================================
+
+CREATE OR REPLACE FUNCTION get_user_processing_stats(target_user_id UUID)
+RETURNS TABLE (
+    total_roasts BIGINT,
+    successful_roasts BIGINT,
+    avg_processing_time DECIMAL,
+    total_processing_time DECIMAL,
+    favorite_file_type TEXT,
+    last_roast_date TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- SECURITY DEFINER bypasses RLS, so only ever return the caller's own stats
+    IF target_user_id IS DISTINCT FROM auth.uid() THEN
+        RAISE EXCEPTION 'get_user_processing_stats: not allowed for another user' USING ERRCODE = '42501';
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        COUNT(*) as total_roasts,
+        COUNT(*) FILTER (WHERE success = true) as successful_roasts,
+        ROUND(AVG(processing_time_seconds), 3) as avg_processing_time,
+        ROUND(SUM(processing_time_seconds), 3) as total_processing_time,
+        MODE() WITHIN GROUP (ORDER BY file_type) as favorite_file_type,
+        MAX(processed_at) as last_roast_date
+    FROM processing_logs
+    WHERE user_id = target_user_id;
+END;
+$$;
+
+-- Function returning everything the roast page renders for a user in one round trip:
+-- stats totals, the 3 most recent processing events and the stored preferences
+CREATE OR REPLACE FUNCTION get_user_page_data(target_user_id UUID)
+RETURNS TABLE (
+    total_roasts BIGINT,
+    successful_roasts BIGINT,
+    avg_processing_time DECIMAL,
+    recent_activity JSONB,
+    preferences JSONB
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- SECURITY DEFINER bypasses RLS, so only ever return the caller's own data
+    IF target_user_id IS DISTINCT FROM auth.uid() THEN
+        RAISE EXCEPTION 'get_user_page_data: not allowed for another user' USING ERRCODE = '42501';
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        totals.total_roasts,
+        totals.successful_roasts,
+        totals.avg_processing_time,
+        COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('file_type', recent.file_type, 'processed_at', recent.processed_at)
+                             ORDER BY recent.processed_at DESC)
+            FROM (
+                SELECT pl.file_type, pl.processed_at
+                FROM processing_logs pl
+                WHERE pl.user_id = target_user_id
+                ORDER BY pl.processed_at DESC
+                LIMIT 3
+            ) recent
+        ), '[]'::jsonb) as recent_activity,
+        COALESCE((
+            SELECT up.preferences FROM user_preferences up WHERE up.user_id = target_user_id
+        ), '{}'::jsonb) as preferences
+    FROM (
+        SELECT
+            COUNT(*) as total_roasts,
+            COUNT(*) FILTER (WHERE success = true) as successful_roasts,
+            ROUND(AVG(processing_time_seconds), 3) as avg_processing_time
+        FROM processing_logs
+        WHERE user_id = target_user_id
+    ) totals;
+END;
+$$;
+
+-- STEP 5b: Create Model Metrics Functions (used by the app's metrics flusher)
+-- ==============================================
+
+-- Function to estimate a quantile from a fixed-bucket latency histogram
+-- (counts has one more slot than bounds: the last one is +Inf)
+CREATE OR REPLACE FUNCTION histogram_quantile(bounds DECIMAL[], counts INTEGER[], q DECIMAL)
+RETURNS DECIMAL
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+    total BIGINT;
+    seen BIGINT := 0;
+    target_rank DECIMAL;
+    lower_bound DECIMAL;
+    upper_bound DECIMAL;
+BEGIN
+    SELECT COALESCE(SUM(c), 0) INTO total FROM unnest(counts) AS c;
+    IF total = 0 THEN
+        RETURN NULL;
+    END IF;
+    target_rank := q * total;
+    FOR i IN 1 .. array_length(counts, 1) LOOP
+        IF counts[i] > 0 AND seen + counts[i] >= target_rank THEN
+            lower_bound := CASE WHEN i = 1 THEN 0 ELSE bounds[i - 1] END;
+            upper_bound := COALESCE(bounds[i], bounds[array_length(bounds, 1)]);
+            RETURN lower_bound + (upper_bound - lower_bound) * (target_rank - seen) / counts[i];
+        END IF;
+        seen := seen + counts[i];
+    END LOOP;
+    RETURN bounds[array_length(bounds, 1)];
+END;
+$$;
+
+-- Function to add a batch of per-model deltas (called by the application's metrics flusher).
+-- A single INSERT ... ON CONFLICT DO UPDATE adds to the stored totals, so concurrent
+-- flushes from several app servers never overwrite each other.
+CREATE OR REPLACE FUNCTION increment_model_metrics(
+    model_name_param VARCHAR(100),
+    request_count INTEGER,
+    success_count INTEGER,
+    processing_time_total DECIMAL,
+    prompt_tokens_total BIGINT DEFAULT 0,
+    completion_tokens_total BIGINT DEFAULT 0,
+    latency_bounds DECIMAL[] DEFAULT NULL,
+    latency_counts INTEGER[] DEFAULT NULL
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    INSERT INTO ai_model_metrics AS m (
+        model_name,
+        total_requests,
+        successful_requests,
+        total_processing_time,
+        prompt_tokens,
+        completion_tokens,
+        latency_bucket_bounds,
+        latency_bucket_counts,
+        average_processing_time,
+        success_rate,
+        last_updated
+    ) VALUES (
+        model_name_param,
+        request_count,
+        success_count,
+        processing_time_total,
+        prompt_tokens_total,
+        completion_tokens_total,
+        latency_bounds,
+        latency_counts,
+        processing_time_total / NULLIF(request_count, 0),
+        100.0 * success_count / NULLIF(request_count, 0),
+        NOW()
+    )
+    ON CONFLICT (model_name) DO UPDATE SET
+        total_requests = COALESCE(m.total_requests, 0) + EXCLUDED.total_requests,
+        successful_requests = m.successful_requests + EXCLUDED.successful_requests,
+        total_processing_time = m.total_processing_time + EXCLUDED.total_processing_time,
+        prompt_tokens = m.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = m.completion_tokens + EXCLUDED.completion_tokens,
+        latency_bucket_bounds = COALESCE(EXCLUDED.latency_bucket_bounds, m.latency_bucket_bounds),
+        latency_bucket_counts = CASE
+            WHEN EXCLUDED.latency_bucket_counts IS NULL THEN m.latency_bucket_counts
+            WHEN m.latency_bucket_bounds = EXCLUDED.latency_bucket_bounds THEN ARRAY(
+                SELECT old_count + new_count
+                FROM unnest(m.latency_bucket_counts, EXCLUDED.latency_bucket_counts)
+                    WITH ORDINALITY AS buckets(old_count, new_count, bucket_index)
+                ORDER BY bucket_index
+            )
+            -- Bucket layout changed: start the histogram over
+            ELSE EXCLUDED.latency_bucket_counts
+        END,
+        average_processing_time = (m.total_processing_time + EXCLUDED.total_processing_time)
+            / NULLIF(COALESCE(m.total_requests, 0) + EXCLUDED.total_requests, 0),
+        success_rate = 100.0 * (m.successful_requests + EXCLUDED.successful_requests)
+            / NULLIF(COALESCE(m.total_requests, 0) + EXCLUDED.total_requests, 0),
+        last_updated = NOW();
+
+    -- The upsert holds the row lock, so percentiles are computed from a consistent histogram
+    UPDATE ai_model_metrics
+    SET
+        latency_p50 = histogram_quantile(latency_bucket_bounds, latency_bucket_counts, 0.50),
+        latency_p95 = histogram_quantile(latency_bucket_bounds, latency_bucket_counts, 0.95),
+        latency_p99 = histogram_quantile(latency_bucket_bounds, latency_bucket_counts, 0.99)
+    WHERE model_name = model_name_param
+        AND latency_bucket_counts IS NOT NULL;
+END;
+$$;
+
+-- Function to record a single request (kept for compatibility; adds atomically)
+CREATE OR REPLACE FUNCTION update_model_metrics(
+    model_name_param VARCHAR(100),
+    processing_time DECIMAL(10,3),
+    success_flag BOOLEAN
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    PERFORM increment_model_metrics(
+        model_name_param,
+        1,
+        CASE WHEN success_flag THEN 1 ELSE 0 END,
+        processing_time
+    );
+END;
+$$;
+
+-- STEP 6: Grant Permissions
 -- ==============================================
 
 GRANT SELECT, INSERT ON processing_logs TO authenticated;
@@ -86,7 +336,7 @@ GRANT USAGE ON SEQUENCE processing_logs_id_seq TO authenticated;
 GRANT USAGE ON SEQUENCE user_preferences_id_seq TO authenticated;
 GRANT USAGE ON SEQUENCE ai_model_metrics_id_seq TO authenticated;
 
--- STEP 6: Insert Sample Data (Optional)
+-- STEP 7: Insert Sample Data (Optional)
 -- ==============================================
 
 INSERT INTO ai_model_metrics (model_name, average_processing_time, success_rate, total_requests)